@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks für erstelle_kalender.py mit deterministischen, synthetischen ICS-Feeds.
+
+- Offline: Feeds werden als Dateien erzeugt und per file:// geladen
+- Reproduzierbar: feste Seeds, „jetzt“ über KALENDER_JETZT (Standard: Mi 14.10.2026 10:00)
+- Je Szenario: Ende-zu-Ende kalt (leerer Cache) und warm (Index vorhanden, Fingerprint gelöscht),
+  Zeiten je Stufe aus den Metriken des Skripts, Spitzen-Speicher (tracemalloc, kalter Lauf)
+- Vergleich gegen benchmark_baseline.json; Regression = langsamer/größer als Baseline × Toleranz
+  oder abweichendes Ergebnis (Vorkommen und angewandte Absagen im kalten Lauf müssen exakt stimmen)
+
+Aufruf:
+  python .github/workflows/benchmark_kalender.py                       # messen + vergleichen
+  python .github/workflows/benchmark_kalender.py --baseline-schreiben  # Baseline neu setzen
+  python .github/workflows/benchmark_kalender.py --nur serien_2k --wiederholungen 5
+Exit-Codes: 0 = ok, 1 = Regression oder abweichendes Ergebnis gegenüber der Baseline
+"""
+
+from __future__ import annotations
+
+import os
+import io
+import sys
+import json
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import importlib.util
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+
+SKRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "erstelle_kalender.py")
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+JETZT = os.getenv("KALENDER_JETZT", "2026-10-14T10:00:00")
+
+# Stufen unterhalb dieser Dauer (Sekunden) sind zu verrauscht für einen Vergleich
+STUFE_MINDESTDAUER = 0.05
+
+# Zähler des kalten Laufs, die das Ergebnis beschreiben (ausgegebene Vorkommen, angewandte Absagen);
+# sie werden exakt verglichen, damit eine schnellere, aber falsche Expansion den Benchmark nicht besteht
+ERGEBNIS_ZAEHLER = ("vorkommen", "absage_treffer")
+
+
+# ----------------------------- Feed-Generatoren -----------------------------
+
+def _ts(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def _offset(minuten: int) -> str:
+    vorzeichen = "-" if minuten < 0 else "+"
+    return f"{vorzeichen}{abs(minuten) // 60:02d}{abs(minuten) % 60:02d}"
+
+
+def _vevent(zeilen: List[str]) -> str:
+    return "\r\n".join(["BEGIN:VEVENT", "DTSTAMP:20260101T000000Z", *zeilen, "END:VEVENT"])
+
+
+def _kalender(vevents: List[str], zeitzonen: List[str] | None = None) -> bytes:
+    kopf = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//benchmark//kalender//DE"]
+    teile = kopf + (zeitzonen or []) + vevents + ["END:VCALENDAR", ""]
+    return "\r\n".join(teile).encode("utf-8")
+
+
+def _basis() -> datetime:
+    return datetime.fromisoformat(JETZT).replace(tzinfo=None)
+
+
+def feed_einzeltermine_10k(rnd: random.Random) -> bytes:
+    """10.000 Einzeltermine, gleichmäßig über ±1 Jahr um „jetzt“ verteilt."""
+    basis = _basis()
+    vevents = []
+    for i in range(10_000):
+        start = (basis + timedelta(days=rnd.randint(-365, 365))).replace(hour=rnd.randint(7, 18), minute=0)
+        ende = start + timedelta(minutes=rnd.choice((30, 60, 90, 180)))
+        vevents.append(_vevent([
+            f"UID:einzel-{i}@bench",
+            f"DTSTART;TZID=Europe/Vienna:{_ts(start)}",
+            f"DTEND;TZID=Europe/Vienna:{_ts(ende)}",
+            f"SUMMARY:Termin {i}",
+            f"LOCATION:Raum {i % 40}",
+        ]))
+    return _kalender(vevents)
+
+
+def feed_serien_2k(rnd: random.Random) -> bytes:
+    """2.000 langlebige Wochenserien (seit 2015–2025), teils mit INTERVAL, UNTIL oder COUNT."""
+    tage = ["MO", "TU", "WE", "TH", "FR"]
+    vevents = []
+    for i in range(2_000):
+        start = datetime(rnd.randint(2015, 2025), rnd.randint(1, 12), rnd.randint(1, 28), rnd.randint(7, 17), 0)
+        byday = ",".join(sorted(rnd.sample(tage, rnd.randint(1, 3)), key=tage.index))
+        regel = f"FREQ=WEEKLY;BYDAY={byday}"
+        if i % 4 == 0:
+            regel += ";INTERVAL=2"
+        if i % 10 == 1:
+            regel += f";UNTIL={_ts(_basis() + timedelta(days=rnd.randint(-400, 400)))}Z"
+        elif i % 10 == 2:
+            regel += ";COUNT=500"
+        vevents.append(_vevent([
+            f"UID:serie-{i}@bench",
+            f"DTSTART;TZID=Europe/Vienna:{_ts(start)}",
+            f"DTEND;TZID=Europe/Vienna:{_ts(start + timedelta(hours=1))}",
+            f"RRULE:{regel}",
+            f"SUMMARY:Serie {i}",
+        ]))
+    return _kalender(vevents)
+
+
+def feed_exdate_rdate(rnd: random.Random) -> bytes:
+    """300 Tagesserien mit je 300 EXDATEs und 50 RDATEs (lange Wertlisten)."""
+    basis = _basis()
+    vevents = []
+    for i in range(300):
+        start = datetime(2020, 1, 1, 8 + i % 9, 0)
+        offsets = rnd.sample(range((basis - start).days + 60), 300)
+        exdates = ",".join(_ts(start + timedelta(days=d)) for d in sorted(offsets))
+        rdates = ",".join(
+            _ts((start + timedelta(days=rnd.randint(0, 2500))).replace(hour=19)) for _ in range(50)
+        )
+        vevents.append(_vevent([
+            f"UID:exdate-{i}@bench",
+            f"DTSTART;TZID=Europe/Vienna:{_ts(start)}",
+            f"DTEND;TZID=Europe/Vienna:{_ts(start + timedelta(minutes=30))}",
+            "RRULE:FREQ=DAILY",
+            f"EXDATE;TZID=Europe/Vienna:{exdates}",
+            f"RDATE;TZID=Europe/Vienna:{rdates}",
+            f"SUMMARY:Täglich {i}",
+        ]))
+    return _kalender(vevents)
+
+
+def feed_overrides(rnd: random.Random) -> bytes:
+    """300 Wochenserien mit je 60 RECURRENCE-ID-Overrides (verschoben, SEQUENCE 1)."""
+    basis = _basis()
+    vevents = []
+    for i in range(300):
+        start = (basis - timedelta(weeks=70)).replace(hour=9 + i % 8, minute=0)
+        start -= timedelta(days=start.weekday())
+        vevents.append(_vevent([
+            f"UID:override-{i}@bench",
+            f"DTSTART;TZID=Europe/Vienna:{_ts(start)}",
+            f"DTEND;TZID=Europe/Vienna:{_ts(start + timedelta(hours=1))}",
+            "RRULE:FREQ=WEEKLY",
+            f"SUMMARY:Jour fixe {i}",
+        ]))
+        for woche in sorted(rnd.sample(range(80), 60)):
+            original = start + timedelta(weeks=woche)
+            neu = original + timedelta(hours=rnd.choice((1, 2, 24, 48)))
+            vevents.append(_vevent([
+                f"UID:override-{i}@bench",
+                f"RECURRENCE-ID;TZID=Europe/Vienna:{_ts(original)}",
+                "SEQUENCE:1",
+                f"DTSTART;TZID=Europe/Vienna:{_ts(neu)}",
+                f"DTEND;TZID=Europe/Vienna:{_ts(neu + timedelta(hours=1))}",
+                f"SUMMARY:Jour fixe {i} (verschoben)",
+            ]))
+    return _kalender(vevents)
+
+
+def feed_absagen(rnd: random.Random) -> bytes:
+    """300 Wochenserien mit je 60 abgesagten Instanzen + 3.000 abgesagte Einzeltermine."""
+    basis = _basis()
+    vevents = []
+    for i in range(300):
+        start = (basis - timedelta(weeks=70)).replace(hour=8 + i % 9, minute=30)
+        start -= timedelta(days=start.weekday() - i % 5)
+        vevents.append(_vevent([
+            f"UID:absage-serie-{i}@bench",
+            f"DTSTART;TZID=Europe/Vienna:{_ts(start)}",
+            f"DTEND;TZID=Europe/Vienna:{_ts(start + timedelta(minutes=45))}",
+            "RRULE:FREQ=WEEKLY",
+            f"SUMMARY:Teamrunde {i}",
+        ]))
+        for woche in sorted(rnd.sample(range(80), 60)):
+            vevents.append(_vevent([
+                f"UID:absage-serie-{i}@bench",
+                f"RECURRENCE-ID;TZID=Europe/Vienna:{_ts(start + timedelta(weeks=woche))}",
+                "STATUS:CANCELLED",
+                f"SUMMARY:Teamrunde {i}",
+            ]))
+    for i in range(3_000):
+        start = (basis + timedelta(days=rnd.randint(-30, 30))).replace(hour=rnd.randint(7, 18), minute=0)
+        vevents.append(_vevent([
+            f"UID:absage-einzel-{i}@bench",
+            f"DTSTART;TZID=Europe/Vienna:{_ts(start)}",
+            f"DTEND;TZID=Europe/Vienna:{_ts(start + timedelta(hours=1))}",
+            "STATUS:CANCELLED",
+            f"SUMMARY:Abgesagt {i}",
+        ]))
+    return _kalender(vevents)
+
+
+def feed_zeitzonen(rnd: random.Random) -> bytes:
+    """8 eigene VTIMEZONEs + IANA-Zonen + UTC: je 2.000 Wochenserien und Einzeltermine."""
+    zeitzonen = []
+    tzids = []
+    for n in range(8):
+        std = (n - 3) * 60
+        tzid = f"Bench Zone {n}"
+        tzids.append(tzid)
+        zeitzonen.append("\r\n".join([
+            "BEGIN:VTIMEZONE", f"TZID:{tzid}",
+            "BEGIN:STANDARD", "DTSTART:19701025T030000", "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+            f"TZOFFSETFROM:{_offset(std + 60)}", f"TZOFFSETTO:{_offset(std)}", "END:STANDARD",
+            "BEGIN:DAYLIGHT", "DTSTART:19700329T020000", "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+            f"TZOFFSETFROM:{_offset(std)}", f"TZOFFSETTO:{_offset(std + 60)}", "END:DAYLIGHT",
+            "END:VTIMEZONE",
+        ]))
+    tzids += ["America/New_York", "Asia/Tokyo", "Europe/London", "UTC"]
+
+    basis = _basis()
+    vevents = []
+    for i in range(4_000):
+        tzid = tzids[i % len(tzids)]
+        if i % 2:
+            start = (basis + timedelta(days=rnd.randint(-200, 200))).replace(hour=rnd.randint(0, 23), minute=0)
+            regel: List[str] = []
+        else:
+            start = datetime(rnd.randint(2018, 2025), rnd.randint(1, 12), rnd.randint(1, 28), rnd.randint(0, 23), 0)
+            regel = ["RRULE:FREQ=WEEKLY"]
+        if tzid == "UTC":
+            dt = [f"DTSTART:{_ts(start)}Z", f"DTEND:{_ts(start + timedelta(hours=1))}Z"]
+        else:
+            dt = [f"DTSTART;TZID={tzid}:{_ts(start)}", f"DTEND;TZID={tzid}:{_ts(start + timedelta(hours=1))}"]
+        vevents.append(_vevent([f"UID:tz-{i}@bench", *dt, *regel, f"SUMMARY:Zone {tzid} {i}"]))
+    return _kalender(vevents, zeitzonen)
+
+
+SZENARIEN: Dict[str, Callable[[random.Random], bytes]] = {
+    "einzeltermine_10k": feed_einzeltermine_10k,
+    "serien_2k": feed_serien_2k,
+    "exdate_rdate": feed_exdate_rdate,
+    "overrides": feed_overrides,
+    "absagen": feed_absagen,
+    "zeitzonen": feed_zeitzonen,
+}
+
+
+# ----------------------------- Messung -----------------------------
+
+def lade_skript() -> Any:
+    """Importiert erstelle_kalender.py als Modul (Konstanten aus der Umgebung werden beim Import gelesen)."""
+    os.environ.setdefault("KALENDER_JETZT", JETZT)
+    spec = importlib.util.spec_from_file_location("erstelle_kalender", SKRIPT)
+    modul = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modul)
+    return modul
+
+
+def lauf(modul: Any, ics_pfad: str, verzeichnis: str) -> Dict[str, Any]:
+    """Ein vollständiger Lauf (erstelle_kalender_html) im Arbeitsverzeichnis; Ausgaben werden verworfen."""
+    os.chdir(verzeichnis)
+    try:
+        os.remove(modul.FINGERPRINT_FILE)
+    except OSError:
+        pass
+    os.environ["ICS_URL"] = "file://" + ics_pfad
+    # Wie ein eigener Prozess je Lauf: ohne den Stand unveränderter lokaler Dateien aus dem Vorlauf
+    modul._DATEI_STAENDE.clear()
+    modul.METRIKEN.zuruecksetzen()
+    t0 = perf_counter()
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as fehler:
+        try:
+            modul.erstelle_kalender_html()
+        except SystemExit as e:
+            if e.code not in (0, None):
+                raise RuntimeError(f"Lauf fehlgeschlagen (Exit {e.code}): {fehler.getvalue()}") from e
+    return {
+        "sekunden": perf_counter() - t0,
+        "stufen": dict(modul.METRIKEN.stufen),
+        "zaehler": dict(modul.METRIKEN.zaehler),
+    }
+
+
+def messe_szenario(modul: Any, name: str, ics_pfad: str, wiederholungen: int) -> Dict[str, Any]:
+    kalt: List[Dict[str, Any]] = []
+    warm: List[Dict[str, Any]] = []
+    for _ in range(wiederholungen):
+        verzeichnis = tempfile.mkdtemp(prefix=f"bench-{name}-")
+        try:
+            kalt.append(lauf(modul, ics_pfad, verzeichnis))
+            warm.append(lauf(modul, ics_pfad, verzeichnis))
+        finally:
+            os.chdir(os.path.dirname(ics_pfad))
+            shutil.rmtree(verzeichnis, ignore_errors=True)
+
+    # Speicher getrennt messen: tracemalloc verlangsamt den Lauf deutlich
+    verzeichnis = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        tracemalloc.start()
+        lauf(modul, ics_pfad, verzeichnis)
+        spitze = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        os.chdir(os.path.dirname(ics_pfad))
+        shutil.rmtree(verzeichnis, ignore_errors=True)
+
+    bester_kalt = min(kalt, key=lambda m: m["sekunden"])
+    return {
+        "ergebnis": {z: bester_kalt["zaehler"].get(z, 0) for z in ERGEBNIS_ZAEHLER},
+        "feed_bytes": os.path.getsize(ics_pfad),
+        "kalt_s": round(bester_kalt["sekunden"], 4),
+        "warm_s": round(min(m["sekunden"] for m in warm), 4),
+        "spitze_mib": round(spitze / 2**20, 2),
+        "stufen_kalt": {k: round(v, 4) for k, v in sorted(bester_kalt["stufen"].items())},
+        "zaehler_kalt": bester_kalt["zaehler"],
+    }
+
+
+def vergleiche(ergebnisse: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], toleranz: float) -> List[str]:
+    """Liste der Regressionen (Ergebniszähler, Gesamtzeiten, Speicher, nicht-triviale Stufen)."""
+    regressionen = []
+    for name, aktuell in ergebnisse.items():
+        alt = baseline.get(name)
+        if not alt:
+            continue
+        for zaehler, vorher in alt.get("ergebnis", {}).items():
+            if aktuell["ergebnis"].get(zaehler, 0) != vorher:
+                regressionen.append(f"{name}: Ergebnis {zaehler} {aktuell['ergebnis'].get(zaehler, 0)} ≠ {vorher} (Baseline)")
+        for feld in ("kalt_s", "warm_s", "spitze_mib"):
+            if feld in alt and aktuell[feld] > alt[feld] * toleranz:
+                regressionen.append(f"{name}: {feld} {aktuell[feld]} > {alt[feld]} × {toleranz:g}")
+        for stufe, wert in aktuell["stufen_kalt"].items():
+            vorher = alt.get("stufen_kalt", {}).get(stufe)
+            if vorher is not None and vorher >= STUFE_MINDESTDAUER and wert > vorher * toleranz:
+                regressionen.append(f"{name}: Stufe {stufe} {wert}s > {vorher}s × {toleranz:g}")
+    return regressionen
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks für erstelle_kalender.py")
+    parser.add_argument("--nur", action="append", choices=sorted(SZENARIEN), help="nur dieses Szenario (mehrfach möglich)")
+    parser.add_argument("--wiederholungen", type=int, default=3, help="Läufe je Szenario, gewertet wird der schnellste")
+    parser.add_argument("--toleranz", type=float, default=1.5, help="erlaubter Faktor gegenüber der Baseline")
+    parser.add_argument("--baseline-schreiben", action="store_true", help="Ergebnisse als neue Baseline speichern")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich in diese Datei schreiben")
+    args = parser.parse_args()
+
+    modul = lade_skript()
+    feed_dir = tempfile.mkdtemp(prefix="bench-feeds-")
+    ergebnisse: Dict[str, Dict[str, Any]] = {}
+    try:
+        for name in args.nur or SZENARIEN:
+            ics_pfad = os.path.join(feed_dir, f"{name}.ics")
+            with open(ics_pfad, "wb") as f:
+                f.write(SZENARIEN[name](random.Random(name)))
+            ergebnisse[name] = messe_szenario(modul, name, ics_pfad, max(1, args.wiederholungen))
+            e = ergebnisse[name]
+            print(
+                f"{name:<18} {e['feed_bytes'] / 2**20:6.1f} MiB  kalt {e['kalt_s']:7.3f}s  "
+                f"warm {e['warm_s']:7.3f}s  Spitze {e['spitze_mib']:7.1f} MiB"
+            )
+            stufen = ", ".join(f"{k} {v:.3f}" for k, v in e["stufen_kalt"].items() if v >= 0.001)
+            print(f"{'':<18} Stufen (kalt): {stufen}")
+            print(f"{'':<18} Ergebnis: {', '.join(f'{k} {v}' for k, v in e['ergebnis'].items())}")
+    finally:
+        shutil.rmtree(feed_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(ergebnisse, f, indent=2, ensure_ascii=False)
+
+    if args.baseline_schreiben:
+        baseline = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(ergebnisse)
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline in '{BASELINE_FILE}' geschrieben.")
+        return
+
+    if not os.path.exists(BASELINE_FILE):
+        print("Keine Baseline vorhanden – mit --baseline-schreiben anlegen.")
+        return
+    with open(BASELINE_FILE, encoding="utf-8") as f:
+        regressionen = vergleiche(ergebnisse, json.load(f), args.toleranz)
+    if regressionen:
+        print("Regressionen gegenüber der Baseline:", file=sys.stderr)
+        for zeile in regressionen:
+            print(f"  - {zeile}", file=sys.stderr)
+        sys.exit(1)
+    print("Keine Regression gegenüber der Baseline.")
+
+
+if __name__ == "__main__":
+    main()
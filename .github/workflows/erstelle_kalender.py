@@ -10,8 +10,38 @@ Erstellt eine statische Wochenübersicht (Mo–Fr) als HTML aus einer ICS-Quelle
 - Fußzeile: steht immer am Seitenende (Sticky-Footer)
 - Branding: Kopfzeilen-Grün fest im Code
 
-Voraussetzung: Environment-Variable ICS_URL mit der öffentlich erreichbaren ICS-Datei.
-Ausgabe: public/calendar/index.html
+Voraussetzung: Environment-Variable ICS_URL mit der öffentlich erreichbaren ICS-Datei (oder file://);
+               mehrere Quellen durch Leerzeichen/Zeilenumbrüche getrennt – sie werden parallel geladen
+               und zu einer Ansicht vereinigt (gleiche UID + Start erscheint nur einmal)
+Lokal: lokale Pfade und file://-URLs dürfen auch Verzeichnisse sein (jede *.ics-Datei darin, rekursiv,
+       sortiert); große Dateien werden per mmap gelesen, unveränderte (Größe/mtime) nicht erneut
+Ausgabe: public/calendar/index.html (aktuelle Woche) + public/calendar/kw/<JJJJ>-W<KW>/index.html
+Bereich: KALENDER_WOCHEN=N (aktuelle + folgende Wochen), KALENDER_ARCHIV=<Jahr> (alle KW eines Jahres)
+Vorfilter: KALENDER_VORFILTER=0 deaktiviert die Streaming-Vorauswahl der VEVENT-Blöcke
+Cache: KALENDER_CACHE_DIR (Standard: .cache/kalender) für ETag/Last-Modified + letzten ICS-Stand
+Index: KALENDER_INDEX=0 deaktiviert den SQLite-Index (termine.sqlite); sonst werden nur geänderte
+       VEVENT-Blöcke (Inhalts-Hash je UID) geparst und expandiert
+Daemon: --daemon pollt alle KALENDER_INTERVALL Sekunden (Standard 60) und rendert nur bei Änderungen;
+        Zustand in KALENDER_HEALTH_FILE (Standard: <Cache>/daemon-health.json);
+        KALENDER_HTTP_PORT startet einen HTTP-Server (ETag/304, gzip/br, Keep-Alive) aus dem Speicher
+Parser: KALENDER_PARSER=leicht liest die VEVENT-Blöcke ohne icalendar-Objektbaum (Properties werden erst
+        beim Zugriff dekodiert); Standard ist icalendar
+Streaming: der Feed wird schon während des Downloads entfaltet und vorgefiltert (KALENDER_STREAMING=0 → erst
+           vollständig laden, dann zerlegen); der Rohinhalt liegt nur im Fetch-Cache auf der Platte
+Abruf: dauert er länger als KALENDER_FETCH_BUDGET Sekunden (Standard 10) oder schlägt er fehl, wird
+       aus dem letzten Stand im Cache gerendert und die Seite als veraltet markiert (ohne letzten Stand
+       wird bis zum Connect- plus Read-Timeout gewartet); ein Einzellauf lässt den Abruf danach noch
+       fertig laufen, damit der Cache für den nächsten Lauf aktuell ist
+HTTP: eine Session mit Keep-Alive-Pool, gzip/deflate (br mit brotli), KALENDER_RETRIES Wiederholungen mit
+      exponentiellem Backoff, KALENDER_CONNECT_TIMEOUT/KALENDER_READ_TIMEOUT Sekunden (Standard 5/30)
+Zeit: KALENDER_JETZT=<ISO-8601> legt „jetzt“ fest (Benchmarks, reproduzierbare Läufe)
+Profil: KALENDER_PROFIL=<Verzeichnis> schreibt pstats, tracemalloc-Top-Allokationen und die teuersten Serien
+Metriken: Laufzeit/Zähler je Stufe nach KALENDER_METRIKEN (JSON) und KALENDER_PROM_FILE (Prometheus)
+Grenzen: Serien über KALENDER_MAX_ITERATIONEN, KALENDER_MAX_VORKOMMEN oder KALENDER_MAX_MS_SERIE werden
+         übersprungen und in den Metriken gemeldet; KALENDER_BUILD_BUDGET (Sekunden) begrenzt die Expansion.
+         Ein Build mit übersprungenen Serien schreibt keinen Fingerprint (der nächste Lauf baut erneut)
+Exit-Codes: 0 = geschrieben, 1 = ICS_URL fehlt/Einstellung ungültig, 2 = Laden (ohne Cache)/Parsen fehlgeschlagen,
+            3 = unverändert (Build-Fingerprint identisch, nichts geschrieben)
 """
 
 from __future__ import annotations
@@ -19,18 +49,588 @@ from __future__ import annotations
 import os
 import sys
 import html
+import re
+import json
+import gzip
+import hashlib
+import io
+import inspect
+import mmap
+import cProfile
+import pstats
+import signal
+import sqlite3
+import threading
+import tracemalloc
+import weakref
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from icalendar import Calendar
+from icalendar.timezone import tzp
 from zoneinfo import ZoneInfo
 from dateutil.rrule import rrulestr
-from datetime import datetime, date, time, timedelta
-from typing import Any, Dict, List
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, date, time, timedelta, timezone, tzinfo
+from time import perf_counter
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+try:  # optional: Brotli-Variante für den HTTP-Server
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def zahl_aus_umgebung(name: str, standard: str, typ: Callable[[str], Any] = int) -> Any:
+    """Zahlen-Einstellung aus der Umgebung (leer = Standard); ungültige Werte beenden mit Exit 1."""
+    roh = os.getenv(name, "").strip() or standard
+    try:
+        return typ(roh)
+    except ValueError:
+        art = "ganze Zahl" if typ is int else "Zahl"
+        print(f"Fehler: {name}={roh!r} ist keine gültige {art}.", file=sys.stderr)
+        sys.exit(1)
+
 
 OUTPUT_HTML_FILE = "public/calendar/index.html"
+PUBLIC_DIR = os.path.dirname(os.path.dirname(OUTPUT_HTML_FILE))
+FINGERPRINT_FILE = os.path.join(os.path.dirname(OUTPUT_HTML_FILE), ".build-fingerprint")
+CACHE_DIR = os.getenv("KALENDER_CACHE_DIR", ".cache/kalender")
+REGEL_CACHE_FILE = os.path.join(CACHE_DIR, "regeln.json")
+# Regel-Cache-Einträge, die so viele Tage nicht genutzt wurden (gelöschte Serien), fallen beim Speichern weg
+REGEL_CACHE_TAGE = 30
+INDEX_FILE = os.path.join(CACHE_DIR, "termine.sqlite")
+WOCHEN_DIR = os.path.join(os.path.dirname(OUTPUT_HTML_FILE), "kw")
+# Anzahl Wochen ab der aktuellen; optional zusätzlich alle Kalenderwochen eines Archiv-Jahres
+WOCHEN_ANZAHL = max(1, zahl_aus_umgebung("KALENDER_WOCHEN", "1"))
+ARCHIV_JAHR = zahl_aus_umgebung("KALENDER_ARCHIV", "0")  # 0 = kein Archiv
+if ARCHIV_JAHR and not 2 <= ARCHIV_JAHR <= 9998:  # Jahr 1: Fenster-Puffer läge vor date.min
+    print(f"Fehler: KALENDER_ARCHIV={ARCHIV_JAHR} liegt nicht zwischen 2 und 9998.", file=sys.stderr)
+    sys.exit(1)
+# "0" = ganze Datei an icalendar übergeben (ohne Fenster-Vorfilter)
+VORFILTER_AKTIV = os.getenv("KALENDER_VORFILTER", "1") != "0"
+# Persistenter SQLite-Index der Vorkommen (KALENDER_INDEX=0 → alles im Speicher expandieren)
+INDEX_AKTIV = os.getenv("KALENDER_INDEX", "1") != "0"
+INDEX_SCHEMA_VERSION = "3"
+# Daemon-Modus (--daemon): Poll-Intervall in Sekunden und Health-Datei
+DAEMON_INTERVALL = max(5, zahl_aus_umgebung("KALENDER_INTERVALL", "60"))
+HEALTH_FILE = os.getenv("KALENDER_HEALTH_FILE", os.path.join(CACHE_DIR, "daemon-health.json"))
+# Eingebetteter HTTP-Server im Daemon (nur wenn KALENDER_HTTP_PORT gesetzt ist)
+HTTP_PORT = zahl_aus_umgebung("KALENDER_HTTP_PORT", "0")
+HTTP_HOST = os.getenv("KALENDER_HTTP_HOST", "")
+# Zeitbudget für den Abruf in Sekunden; danach wird aus dem letzten Stand gerendert (als veraltet markiert)
+FETCH_BUDGET = zahl_aus_umgebung("KALENDER_FETCH_BUDGET", "10", float)
+# HTTP-Abruf: getrennte Connect-/Read-Timeouts, begrenzte Wiederholungen (Backoff 0.5s, 1s, 2s, ... max. 8s)
+CONNECT_TIMEOUT = zahl_aus_umgebung("KALENDER_CONNECT_TIMEOUT", "5", float)
+READ_TIMEOUT = zahl_aus_umgebung("KALENDER_READ_TIMEOUT", "30", float)
+HTTP_RETRIES = max(0, zahl_aus_umgebung("KALENDER_RETRIES", "3"))
+HTTP_BACKOFF = 0.5
+HTTP_BACKOFF_MAX = 8.0
+# Parser-Backend für VEVENT-Blöcke: "icalendar" (Standard) oder "leicht" (eigener Tokenizer, lazy)
+PARSER_LEICHT = os.getenv("KALENDER_PARSER", "icalendar").strip().lower() == "leicht"
+# Download in Stücken: Entfalten/Vorfiltern läuft parallel zum Empfang (KALENDER_STREAMING=0 → aus)
+STREAMING_AKTIV = os.getenv("KALENDER_STREAMING", "1") != "0"
+STREAM_CHUNK = 1 << 16
+# Lokale Dateien ab dieser Größe werden per mmap gelesen (Page-Cache statt Lesepuffer)
+MMAP_AB = 8 << 20
+# Metriken je Lauf (leer = aus): JSON und Prometheus-Textfile (node_exporter textfile collector)
+METRIKEN_FILE = os.getenv("KALENDER_METRIKEN", os.path.join(CACHE_DIR, "metriken.json"))
+PROM_FILE = os.getenv("KALENDER_PROM_FILE", os.path.join(CACHE_DIR, "kalender.prom"))
+# Feste „jetzt“-Zeit für reproduzierbare Läufe (ISO-8601, ohne Zone = Europe/Vienna)
+JETZT_FEST = os.getenv("KALENDER_JETZT", "").strip()
+# Profil-Modus: cProfile (pstats), tracemalloc und Kosten je Serie in dieses Verzeichnis
+PROFIL_DIR = os.getenv("KALENDER_PROFIL", "").strip()
+PROFIL_TOP = 20
+# Leitplanken der Expansion je Serie (RRULE-Iterationen, Vorkommen im Fenster, Millisekunden)
+# und Gesamtbudget aller Serien eines Builds in Sekunden (0 = jeweils ohne Grenze)
+MAX_ITERATIONEN = zahl_aus_umgebung("KALENDER_MAX_ITERATIONEN", "200000")
+MAX_VORKOMMEN = zahl_aus_umgebung("KALENDER_MAX_VORKOMMEN", "5000")
+MAX_MS_SERIE = zahl_aus_umgebung("KALENDER_MAX_MS_SERIE", "2000", float)
+BUILD_BUDGET = zahl_aus_umgebung("KALENDER_BUILD_BUDGET", "120", float)
+
+# Bei jeder Änderung an Layout/Logik erhöhen, damit der Fingerprint neu gebaut wird
+RENDERER_VERSION = "3"
+EXIT_UNVERAENDERT = 3
+
+
+# ----------------------------- Metriken -----------------------------
+
+class Metriken:
+    """
+    Laufzeit (Sekunden) und Zähler je Verarbeitungsstufe eines Laufs. Geschachtelte Stufen
+    (parse/serien/expansion in index, rrule in expansion) zählen in der äußeren mit.
+    """
+
+    def __init__(self) -> None:
+        self.zuruecksetzen()
+
+    def zuruecksetzen(self) -> None:
+        self.beginn = datetime.now(timezone.utc)
+        self.stufen: Dict[str, float] = {}
+        self.zaehler: Dict[str, int] = {}
+        # Nur im Profil-Modus: (Sekunden, UID, Titel, RRULE, Vorkommen, EXDATEs) je expandierter Serie
+        self.serien_kosten: List[Tuple[float, str, str, str, int, int]] | None = [] if PROFIL_DIR else None
+        # Wegen einer Grenze übersprungene Serien (UID, Titel, Grund)
+        self.uebersprungen: List[Dict[str, str]] = []
+
+    @contextmanager
+    def stufe(self, name: str) -> Iterator[None]:
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.addiere(name, perf_counter() - t0)
+
+    def addiere(self, name: str, sekunden: float) -> None:
+        self.stufen[name] = self.stufen.get(name, 0.0) + sekunden
+
+    def zaehle(self, name: str, anzahl: int = 1) -> None:
+        self.zaehler[name] = self.zaehler.get(name, 0) + anzahl
+
+    def schreiben(self, exit_code: int) -> None:
+        """Schreibt METRIKEN_FILE (JSON) und PROM_FILE (Prometheus-Textfile, atomar ersetzt)."""
+        ende = datetime.now(timezone.utc)
+        dauer = (ende - self.beginn).total_seconds()
+        if METRIKEN_FILE:
+            speichere_json(METRIKEN_FILE, {
+                "zeitpunkt": ende.isoformat(),
+                "exit_code": exit_code,
+                "dauer_sekunden": round(dauer, 6),
+                "stufen": {k: round(v, 6) for k, v in self.stufen.items()},
+                "zaehler": self.zaehler,
+                "uebersprungen": self.uebersprungen[:100],
+            })
+        if PROM_FILE:
+            zeilen = [
+                "# HELP kalender_stufe_sekunden Laufzeit je Verarbeitungsstufe im letzten Lauf.",
+                "# TYPE kalender_stufe_sekunden gauge",
+                *(f'kalender_stufe_sekunden{{stufe="{k}"}} {v:.6f}' for k, v in sorted(self.stufen.items())),
+                "# HELP kalender_anzahl Zähler des letzten Laufs (Bytes, VEVENTs, Serien, Vorkommen, ...).",
+                "# TYPE kalender_anzahl gauge",
+                *(f'kalender_anzahl{{art="{k}"}} {v}' for k, v in sorted(self.zaehler.items())),
+                "# HELP kalender_lauf_sekunden Gesamtdauer des letzten Laufs.",
+                "# TYPE kalender_lauf_sekunden gauge",
+                f"kalender_lauf_sekunden {dauer:.6f}",
+                "# HELP kalender_exit_code Exit-Code des letzten Laufs (3 = unverändert).",
+                "# TYPE kalender_exit_code gauge",
+                f"kalender_exit_code {exit_code}",
+                "# HELP kalender_letzter_lauf_zeitstempel_sekunden Ende des letzten Laufs (Unix-Zeit).",
+                "# TYPE kalender_letzter_lauf_zeitstempel_sekunden gauge",
+                f"kalender_letzter_lauf_zeitstempel_sekunden {ende.timestamp():.0f}",
+            ]
+            try:
+                schreibe_atomar(PROM_FILE, ("\n".join(zeilen) + "\n").encode("utf-8"))
+            except OSError as e:
+                print(f"Warnung: Metriken '{PROM_FILE}' konnten nicht geschrieben werden: {e}", file=sys.stderr)
+
+
+METRIKEN = Metriken()
+
+
+# ----------------------------- Hilfsfunktionen (Cache) -----------------------------
+
+def schreibe_atomar(pfad: str, daten: bytes) -> None:
+    """Schreibt Bytes über eine Temp-Datei + os.replace (kein halber Stand bei Abbruch)."""
+    os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+    tmp = f"{pfad}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(daten)
+    os.replace(tmp, pfad)
+
+
+def lade_json(pfad: str) -> Dict[str, Any]:
+    """Liest eine JSON-Cache-Datei; fehlend oder kaputt → leerer Cache."""
+    try:
+        with open(pfad, encoding="utf-8") as f:
+            daten = json.load(f)
+        return daten if isinstance(daten, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def speichere_json(pfad: str, daten: Dict[str, Any]) -> None:
+    try:
+        schreibe_atomar(pfad, json.dumps(daten, separators=(",", ":")).encode("utf-8"))
+    except OSError as e:
+        print(f"Warnung: Cache '{pfad}' konnte nicht geschrieben werden: {e}", file=sys.stderr)
+
+
+def fetch_cache_pfade(ics_url: str) -> Tuple[str, str]:
+    """Cache-Dateien je Quelle; die (geheime) URL selbst wird nur gehasht abgelegt."""
+    key = hashlib.sha256(ics_url.encode("utf-8")).hexdigest()[:16]
+    basis = os.path.join(CACHE_DIR, "fetch", key)
+    return f"{basis}.ics", f"{basis}.json"
+
+
+class IcsStand(NamedTuple):
+    """
+    Geladener Feed: SHA-256 des Inhalts, der Inhalt selbst als Datei (pfad) oder – nur wenn der
+    Cache nicht schreibbar ist – im Speicher (roh), beim Streaming zusätzlich die schon während
+    des Lesens zerlegten Blöcke für das Fenster (Start, Ende).
+    """
+    digest: bytes
+    pfad: str | None
+    roh: bytes | None = None
+    bloecke: FeedBloecke | None = None
+    fenster: Tuple[date, date] | None = None
+
+    def stuecke(self) -> Iterator[bytes]:
+        if self.roh is not None:
+            yield self.roh
+        else:
+            yield from datei_stuecke(self.pfad)
+
+
+def datei_stuecke(pfad: str) -> Iterator[bytes]:
+    """Datei in Stücken; ab MMAP_AB Bytes über mmap mit sequentiellem Read-ahead."""
+    with open(pfad, "rb") as f:
+        karte = None
+        if os.fstat(f.fileno()).st_size >= MMAP_AB:
+            try:
+                karte = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                pass  # z. B. Pipe oder Dateisystem ohne mmap: normal lesen
+        if karte is None:
+            while chunk := f.read(STREAM_CHUNK):
+                yield chunk
+            return
+        with karte:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                karte.madvise(mmap.MADV_SEQUENTIAL)
+            for anfang in range(0, len(karte), STREAM_CHUNK):
+                yield karte[anfang:anfang + STREAM_CHUNK]
+
+
+def lokaler_pfad(quelle: str) -> str | None:
+    """Dateipfad einer lokalen Quelle (file://-URL oder Pfad ohne Schema), sonst None."""
+    if quelle.startswith("file://"):
+        return url2pathname(urlparse(quelle).path)
+    if "://" in quelle:
+        return None
+    return os.path.expanduser(quelle)
+
+
+def ics_dateien(verzeichnis: str) -> List[str]:
+    """Alle *.ics-Dateien unterhalb eines Verzeichnisses, sortiert (versteckte ausgenommen)."""
+    dateien: List[str] = []
+    for wurzel, ordner, namen in os.walk(verzeichnis):
+        ordner[:] = sorted(o for o in ordner if not o.startswith("."))
+        dateien += [
+            os.path.join(wurzel, n) for n in sorted(namen) if n.lower().endswith(".ics") and not n.startswith(".")
+        ]
+    return dateien
+
+
+def lies_feed(
+    chunks: Iterable[bytes], fenster: Tuple[date, date] | None, kopie: BinaryIO | None = None
+) -> Tuple[bytes, int, FeedBloecke | None]:
+    """
+    Liest einen Feed Stück für Stück: SHA-256 und Größe, optional eine Kopie (Fetch-Cache), mit
+    Fenster zugleich zerlegt und vorgefiltert. Rückgabe: (Digest, Bytes, Blöcke oder None).
+    """
+    h = hashlib.sha256()
+    groesse = 0
+
+    def durchreichen() -> Iterator[bytes]:
+        nonlocal groesse
+        for chunk in chunks:
+            h.update(chunk)
+            groesse += len(chunk)
+            if kopie is not None:
+                kopie.write(chunk)
+            yield chunk
+
+    if fenster is None:
+        for _ in durchreichen():
+            pass
+        return h.digest(), groesse, None
+    bloecke = zerlege_feed(durchreichen(), fenster[0], fenster[1], VORFILTER_AKTIV)
+    return h.digest(), groesse, bloecke
+
+
+class _RetryUrllib3v1(Retry):
+    """urllib3 < 2 kennt kein backoff_max: dort begrenzt ein Klassenattribut den Backoff (bleibt bei Retry.new erhalten)."""
+    DEFAULT_BACKOFF_MAX = HTTP_BACKOFF_MAX
+    BACKOFF_MAX = HTTP_BACKOFF_MAX  # urllib3 < 1.26.9
+
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """
+    Gemeinsame Session aller HTTP-Abrufe (auch über Daemon-Durchgänge hinweg): Verbindungen bleiben
+    im Pool offen, Antworten kommen komprimiert, Verbindungs- und 5xx/429-Fehler werden mit
+    exponentiellem Backoff wiederholt. Retry-After wird bewusst ignoriert, damit ein Abruf nie
+    länger als die Backoff-Grenze schläft.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            optionen: Dict[str, Any] = dict(
+                total=HTTP_RETRIES,
+                connect=HTTP_RETRIES,
+                read=HTTP_RETRIES,
+                status=HTTP_RETRIES,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                backoff_factor=HTTP_BACKOFF,
+                respect_retry_after_header=False,
+                raise_on_status=False,
+            )
+            if "backoff_max" in inspect.signature(Retry).parameters:
+                retry: Retry = Retry(backoff_max=HTTP_BACKOFF_MAX, **optionen)
+            else:
+                retry = _RetryUrllib3v1(**optionen)
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=16)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+            _SESSION = session
+        return _SESSION
+
+
+# Zuletzt gelesene lokale Dateien: (Größe, mtime, Inode) → Stand (Daemon, Verzeichnisse)
+_DATEI_STAENDE: Dict[str, Tuple[Tuple[int, int, int], IcsStand]] = {}
+
+
+def lade_ics(
+    ics_url: str,
+    fenster: Tuple[date, date] | None = None,
+    timeout: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+) -> Tuple[IcsStand, bool]:
+    """
+    Lädt die ICS-Datei mit Conditional GET (If-None-Match / If-Modified-Since) über http_session().
+    Der Body wird in Stücken empfangen, direkt in den Fetch-Cache geschrieben und – mit Fenster –
+    währenddessen schon entfaltet und vorgefiltert. Rückgabe: (Stand, unverändert) – bei 304
+    kommt der Inhalt aus dem Cache. Lokale Dateien werden direkt gelesen (offline, z. B. für
+    Benchmarks) – bei gleicher Größe/mtime/Inode und gleichem Fenster gar nicht erneut.
+    """
+    pfad = lokaler_pfad(ics_url)
+    if pfad is not None:
+        st = os.stat(pfad)
+        kennung = (st.st_size, st.st_mtime_ns, st.st_ino)
+        frueher = _DATEI_STAENDE.get(pfad)
+        if frueher is not None and frueher[0] == kennung and frueher[1].fenster == fenster:
+            METRIKEN.zaehle("dateien_unveraendert")
+            return frueher[1], False
+        digest, groesse, bloecke = lies_feed(datei_stuecke(pfad), fenster)
+        METRIKEN.zaehle("bytes_geladen", groesse)
+        stand = IcsStand(digest, pfad, None, bloecke, fenster)
+        _DATEI_STAENDE[pfad] = (kennung, stand)
+        return stand, False
+
+    body_pfad, meta_pfad = fetch_cache_pfade(ics_url)
+    meta = lade_json(meta_pfad) if os.path.exists(body_pfad) else {}
+
+    headers: Dict[str, str] = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    with http_session().get(ics_url, timeout=timeout, headers=headers, stream=True) as response:
+        wiederholungen = getattr(response.raw, "retries", None)
+        if wiederholungen is not None and wiederholungen.history:
+            METRIKEN.zaehle("fetch_wiederholungen", len(wiederholungen.history))
+        if response.status_code == 304 and headers:
+            digest, _, bloecke = lies_feed(datei_stuecke(body_pfad), fenster)
+            speichere_json(meta_pfad, {**meta, "abgerufen": datetime.now(timezone.utc).isoformat()})
+            return IcsStand(digest, body_pfad, None, bloecke, fenster), True
+        response.raise_for_status()
+
+        # Body (Bytes, nicht .text) direkt in eine Temp-Datei; ohne schreibbaren Cache im Speicher
+        tmp = f"{body_pfad}.tmp"
+        try:
+            os.makedirs(os.path.dirname(body_pfad), exist_ok=True)
+            kopie: BinaryIO = open(tmp, "wb")
+        except OSError as e:
+            print(f"Warnung: ICS-Cache konnte nicht geschrieben werden: {e}", file=sys.stderr)
+            kopie = io.BytesIO()
+        try:
+            with kopie:
+                digest, groesse, bloecke = lies_feed(response.iter_content(STREAM_CHUNK), fenster, kopie)
+                roh = kopie.getvalue() if isinstance(kopie, io.BytesIO) else None
+        except Exception:
+            # Abgebrochener Download: kein halber Stand im Cache
+            if not isinstance(kopie, io.BytesIO):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            raise
+    METRIKEN.zaehle("bytes_geladen", groesse)
+    if roh is not None:
+        return IcsStand(digest, None, roh, bloecke, fenster), False
+
+    os.replace(tmp, body_pfad)
+    speichere_json(meta_pfad, {
+        "etag": response.headers.get("ETag", ""),
+        "last_modified": response.headers.get("Last-Modified", ""),
+        "abgerufen": datetime.now(timezone.utc).isoformat(),
+    })
+    return IcsStand(digest, body_pfad, None, bloecke, fenster), False
+
+
+def lade_letzten_stand(ics_url: str, fenster: Tuple[date, date] | None = None) -> Tuple[IcsStand, datetime] | None:
+    """Letzter erfolgreich geladener ICS-Stand aus dem Fetch-Cache samt Abrufzeit (UTC)."""
+    body_pfad, meta_pfad = fetch_cache_pfade(ics_url)
+    try:
+        abgerufen = datetime.fromtimestamp(os.path.getmtime(body_pfad), timezone.utc)
+        digest, _, bloecke = lies_feed(datei_stuecke(body_pfad), fenster)
+    except OSError:
+        return None
+    try:
+        abgerufen = datetime.fromisoformat(lade_json(meta_pfad)["abgerufen"])
+    except (KeyError, TypeError, ValueError):
+        pass
+    return IcsStand(digest, body_pfad, None, bloecke, fenster), abgerufen
+
+
+class IcsAbruf:
+    """
+    ICS-Abruf in einem Hintergrund-Thread: der Aufrufer wartet höchstens das Zeitbudget, der Abruf
+    selbst läuft weiter und legt sein Ergebnis wie gewohnt im Fetch-Cache ab. Lokale Dateien brauchen
+    keinen Thread (auch nicht bei Verzeichnissen mit vielen Dateien): sie werden erst in warte() gelesen,
+    nachdem alle Netz-Abrufe gestartet sind.
+    """
+
+    def __init__(
+        self, ics_url: str, wecker: threading.Event | None = None, fenster: Tuple[date, date] | None = None
+    ) -> None:
+        self.ics_url = ics_url
+        self.fenster = fenster  # Download-Stücke gleich für dieses Fenster zerlegen (Streaming)
+        self.ergebnis: Tuple[IcsStand, bool] | None = None
+        self.fehler: Exception | None = None
+        self.fertig = threading.Event()
+        self._wecker = wecker  # wird nach Abschluss gesetzt (Daemon: sofort neu rendern)
+        self.lokal = lokaler_pfad(ics_url) is not None
+        if not self.lokal:
+            threading.Thread(target=self._lauf, name="ics-abruf", daemon=True).start()
+
+    def _lauf(self) -> None:
+        try:
+            self.ergebnis = lade_ics(self.ics_url, self.fenster)
+        except Exception as e:
+            self.fehler = e
+        finally:
+            self.fertig.set()
+            if self._wecker is not None:
+                self._wecker.set()
+
+    def warte(self, budget: float) -> bool:
+        if self.lokal and not self.fertig.is_set():
+            self._lauf()
+        return self.fertig.wait(budget)
+
+
+def build_fingerprint(
+    feeds: List[IcsStand], wochen_starts: List[date], today_local: date, veraltet: bool = False
+) -> str:
+    """Fingerprint aus ICS-Inhalten, gerenderten Wochen, heutigem Tag, Veraltet-Hinweis, Renderer- und Index-Version."""
+    h = hashlib.sha256()
+    for stand in feeds:
+        h.update(stand.digest)
+    wochen = ",".join(d.isoformat() for d in wochen_starts)
+    h.update(f"|{wochen}|{today_local.isoformat()}|{int(veraltet)}|{RENDERER_VERSION}|{INDEX_SCHEMA_VERSION}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def fingerprint_unveraendert(fingerprint: str) -> bool:
+    """True, wenn die Ausgabe existiert und mit demselben Fingerprint gebaut wurde."""
+    if not os.path.exists(OUTPUT_HTML_FILE):
+        return False
+    try:
+        with open(FINGERPRINT_FILE, encoding="utf-8") as f:
+            return f.read().strip() == fingerprint
+    except OSError:
+        return False
 
 
 # ----------------------------- Hilfsfunktionen (Zeit) -----------------------------
 
+# Build-Horizont der Offset-Tabellen (± Tage um jetzt); außerhalb rechnet das tzinfo selbst
+TZ_HORIZONT_TAGE = 400
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class OffsetTabelle:
+    """
+    UTC-Offsets einer per VTIMEZONE definierten Zeitzone (dateutil tzicalvtz rechnet jeden Wert
+    über die RRULEs der VTIMEZONE aus). Übergänge werden einmal per Bisektion ermittelt,
+    danach genügt ein bisect auf Wandzeit-Sekunden. IANA-Zonen (zoneinfo) brauchen das nicht:
+    deren astimezone() sucht bereits in C in der Übergangstabelle.
+    """
+
+    def __init__(self, tz: tzinfo, von: int, bis: int) -> None:
+        def offset(t: int) -> int:
+            return int(datetime.fromtimestamp(t, tz).utcoffset().total_seconds())  # type: ignore[union-attr]
+
+        self.von, self.bis = von, bis
+        self.offsets = [offset(von)]
+        self.grenzen: List[int] = []     # Wandzeit, ab der offsets[i + 1] gilt
+        self.unsicher_ab: List[int] = []  # Beginn der Lücke/Überlappung vor grenzen[i]
+        t = von
+        while t < bis:
+            naechster = min(t + 86400, bis)
+            neu = offset(naechster)
+            alt = self.offsets[-1]
+            if neu != alt:
+                lo, hi = t, naechster
+                while hi - lo > 1:
+                    mitte = (lo + hi) // 2
+                    if offset(mitte) == alt:
+                        lo = mitte
+                    else:
+                        hi = mitte
+                self.grenzen.append(hi + max(alt, neu))
+                self.unsicher_ab.append(hi + min(alt, neu))
+                self.offsets.append(neu)
+            t = naechster
+
+    def nach_utc(self, dt: datetime) -> int | None:
+        """UTC-Sekunden eines Wandzeit-Werts; None in Lücken/Überlappungen oder außerhalb des Horizonts."""
+        if dt.microsecond or dt.fold:
+            return None
+        wand = (dt.toordinal() - _EPOCH_ORDINAL) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+        i = bisect_right(self.grenzen, wand)
+        if i < len(self.unsicher_ab) and wand >= self.unsicher_ab[i]:
+            return None
+        utc = wand - self.offsets[i]
+        return utc if self.von <= utc < self.bis else None
+
+
+# je tzinfo-Objekt (icalendar teilt es pro TZID); None = keine Tabelle nötig/möglich
+_OFFSET_TABELLEN: "weakref.WeakKeyDictionary[tzinfo, OffsetTabelle | None]" = weakref.WeakKeyDictionary()
+
+
+def offset_tabelle(tz: tzinfo) -> OffsetTabelle | None:
+    if isinstance(tz, (ZoneInfo, timezone)):
+        return None
+    try:
+        return _OFFSET_TABELLEN[tz]
+    except KeyError:
+        pass
+    except TypeError:
+        return None  # nicht weak-referenzierbar
+    jetzt = int(datetime.now(timezone.utc).timestamp())
+    horizont = TZ_HORIZONT_TAGE * 86400
+    try:
+        tabelle: OffsetTabelle | None = OffsetTabelle(tz, jetzt - horizont, jetzt + horizont)
+    except Exception:
+        tabelle = None
+    _OFFSET_TABELLEN[tz] = tabelle
+    return tabelle
+
+
 def to_local(dt_raw: date | datetime, tz_local: ZoneInfo) -> datetime:
     """
     Normalisiert ICS-Zeitwerte nach lokaler Zeit.
@@ -40,13 +640,31 @@ def to_local(dt_raw: date | datetime, tz_local: ZoneInfo) -> datetime:
     if isinstance(dt_raw, date) and not isinstance(dt_raw, datetime):
         return datetime.combine(dt_raw, time.min, tzinfo=tz_local)
     if isinstance(dt_raw, datetime):
-        if dt_raw.tzinfo is None:
+        tz = dt_raw.tzinfo
+        if tz is None:
             return dt_raw.replace(tzinfo=tz_local).astimezone(tz_local)
+        if tz is not tz_local:
+            tabelle = offset_tabelle(tz)
+            utc = tabelle.nach_utc(dt_raw) if tabelle is not None else None
+            if utc is not None:
+                return datetime.fromtimestamp(utc, tz_local)
         return dt_raw.astimezone(tz_local)
     # Fallback (sollte nicht passieren)
     return datetime.now(tz_local)
 
 
+def to_local_liste(werte: Iterable[date | datetime], tz_local: ZoneInfo) -> List[datetime]:
+    """Wie to_local für ganze EXDATE/RDATE-Listen; doppelte Rohwerte werden nur einmal umgerechnet."""
+    umgerechnet: Dict[date | datetime, datetime] = {}
+    ergebnis = []
+    for wert in werte:
+        lokal = umgerechnet.get(wert)
+        if lokal is None:
+            lokal = umgerechnet[wert] = to_local(wert, tz_local)
+        ergebnis.append(lokal)
+    return ergebnis
+
+
 def is_all_day_component(component) -> bool:
     """Erkennt All-Day-Events am dtstart-Typ."""
     dtstart = component.get("dtstart")
@@ -56,17 +674,898 @@ def is_all_day_component(component) -> bool:
     return isinstance(v, date) and not isinstance(v, datetime)
 
 
+# ----------------------------- ICS-Vorfilter (Streaming) -----------------------------
+
+# Puffer in Tagen: Werte mit fremder TZID/UTC können um bis zu ~26h vom lokalen Tag abweichen
+VORFILTER_PUFFER = timedelta(days=2)
+_DURATION_RE = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def iter_inhaltszeilen(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Entfaltet RFC-5545-Inhaltszeilen inkrementell (auch über Chunk-Grenzen hinweg)."""
+    rest = b""
+    aktuell: bytes | None = None
+    for chunk in chunks:
+        daten = rest + chunk
+        zeilen = daten.split(b"\n")
+        rest = zeilen.pop()
+        for zeile in zeilen:
+            if zeile.endswith(b"\r"):
+                zeile = zeile[:-1]
+            if zeile[:1] in (b" ", b"\t"):
+                if aktuell is not None:
+                    aktuell += zeile[1:]
+                continue
+            if aktuell is not None:
+                yield aktuell
+            aktuell = zeile
+    if rest.endswith(b"\r"):
+        rest = rest[:-1]
+    if rest[:1] in (b" ", b"\t") and aktuell is not None:
+        aktuell += rest[1:]
+        rest = b""
+    if aktuell is not None:
+        yield aktuell
+    if rest:
+        yield rest
+
+
+def zerlege_zeile(zeile: bytes) -> Tuple[str, bytes, bytes]:
+    """Zerlegt eine Inhaltszeile in (NAME, Parameter, Wert); ':' in Anführungszeichen zählt nicht."""
+    in_quotes = False
+    for i, c in enumerate(zeile):
+        if c == 0x22:  # "
+            in_quotes = not in_quotes
+        elif c == 0x3A and not in_quotes:  # :
+            kopf, wert = zeile[:i], zeile[i + 1:]
+            break
+    else:
+        kopf, wert = zeile, b""
+    name, _, params = kopf.partition(b";")
+    return name.decode("ascii", "replace").upper(), params, wert
+
+
+def iter_bloecke(zeilen: Iterable[bytes]) -> Iterator[Tuple[str, List[bytes]]]:
+    """
+    Liefert (Komponentenname, Zeilen) für jede direkte Unterkomponente von VCALENDAR
+    sowie ("VCALENDAR", Kopfzeilen) am Ende. Verschachtelte Blöcke (VALARM) bleiben im Elternblock.
+    """
+    kopf: List[bytes] = []
+    block: List[bytes] | None = None
+    name = ""
+    tiefe = 0
+    for zeile in zeilen:
+        oben = zeile[:6].upper()
+        if oben == b"BEGIN:":
+            tiefe += 1
+            if tiefe == 2:
+                name = zeile[6:].strip().decode("ascii", "replace").upper()
+                block = [zeile]
+                continue
+        elif oben[:4] == b"END:":
+            tiefe -= 1
+            if tiefe == 1 and block is not None:
+                block.append(zeile)
+                yield name, block
+                block = None
+                continue
+        if block is not None:
+            block.append(zeile)
+        elif tiefe == 1 and oben != b"BEGIN:":
+            kopf.append(zeile)
+    yield "VCALENDAR", kopf
+
+
+def _ics_datum(wert: bytes) -> date | None:
+    """Liest das Datum (YYYYMMDD) am Anfang eines DATE/DATE-TIME-Werts."""
+    try:
+        return date(int(wert[0:4]), int(wert[4:6]), int(wert[6:8]))
+    except ValueError:
+        return None
+
+
+def _ics_dauer(wert: bytes) -> timedelta | None:
+    m = _DURATION_RE.match(wert.strip().decode("ascii", "replace"))
+    if not m or m.group(1) == "-":
+        return None
+    w, d, h, mi, s = (int(x) if x else 0 for x in m.groups()[1:])
+    return timedelta(weeks=w, days=d, hours=h, minutes=mi, seconds=s)
+
+
+def vevent_im_fenster(block: List[bytes], fenster_start: date, fenster_ende: date) -> bool:
+    """
+    Konservative Prüfung auf Rohtext-Ebene, ob ein VEVENT-Block das Fenster berühren kann.
+    Im Zweifel (unbekannte Werte, offene Serien, COUNT) wird der Block behalten. Overrides ohne
+    DTSTART (typisch: Absage nur mit RECURRENCE-ID + STATUS:CANCELLED) werden an der
+    RECURRENCE-ID verankert.
+    """
+    dtstart: date | None = None
+    recurrence_id: date | None = None
+    dtend: date | None = None
+    dauer: timedelta | None = None
+    dauer_gesehen = False
+    rrule: bytes | None = None
+    weitere: List[date] = []  # RECURRENCE-ID, RDATE
+    tiefe = 0
+    for zeile in block[1:-1]:
+        name, _, wert = zerlege_zeile(zeile)
+        if name == "BEGIN":
+            tiefe += 1
+        elif name == "END":
+            tiefe -= 1
+        if tiefe or not wert:
+            continue
+        if name == "DTSTART":
+            dtstart = _ics_datum(wert)
+        elif name == "DTEND":
+            dtend = _ics_datum(wert)
+        elif name == "DURATION":
+            dauer_gesehen = True
+            dauer = _ics_dauer(wert)
+        elif name == "RRULE":
+            rrule = wert.upper()
+        elif name in ("RECURRENCE-ID", "RDATE"):
+            for teil in wert.split(b","):
+                d = _ics_datum(teil)
+                if d is None:
+                    return True
+                weitere.append(d)
+                if name == "RECURRENCE-ID":
+                    recurrence_id = d
+
+    if dtstart is None:
+        if recurrence_id is None:
+            return False
+        dtstart = recurrence_id
+
+    if dtend is not None:
+        laenge = max(dtend - dtstart, timedelta(0))
+    elif dauer is not None:
+        laenge = dauer
+    elif dauer_gesehen:
+        return True  # nicht lesbare Dauer
+    else:
+        laenge = timedelta(0)
+
+    frueheste = min([dtstart] + weitere)
+    spaeteste = max([dtstart + laenge] + [d + laenge for d in weitere])
+
+    if rrule is not None:
+        teile = dict(p.partition(b"=")[::2] for p in rrule.split(b";"))
+        until = _ics_datum(teile[b"UNTIL"]) if b"UNTIL" in teile else None
+        if until is None:
+            return frueheste <= fenster_ende + VORFILTER_PUFFER
+        spaeteste = max(spaeteste, until + laenge)
+
+    return frueheste <= fenster_ende + VORFILTER_PUFFER and spaeteste >= fenster_start - VORFILTER_PUFFER
+
+
+class FeedBloecke(NamedTuple):
+    kopf: List[bytes]           # Kopfzeilen von VCALENDAR
+    zeitzonen: List[bytes]      # alle VTIMEZONE-Zeilen
+    vevents: List[List[bytes]]  # VEVENT-Blöcke (entfaltete Zeilen)
+
+
+def zerlege_feed(
+    ics: bytes | Iterable[bytes], fenster_start: date, fenster_ende: date, vorfiltern: bool = True
+) -> FeedBloecke:
+    """
+    Streaming-Zerlegung in Rohblöcke (ganzer Inhalt oder Stücke, z. B. direkt aus dem Download);
+    mit Vorfilter bleiben nur VEVENT-Blöcke, die das Fenster berühren können. VTIMEZONE-Blöcke
+    und Kalenderkopf bleiben erhalten, damit TZIDs auflösbar sind.
+    """
+    vevents: List[List[bytes]] = []
+    zeitzonen: List[bytes] = []
+    kopf: List[bytes] = []
+    for name, block in iter_bloecke(iter_inhaltszeilen([ics] if isinstance(ics, bytes) else ics)):
+        if name == "VEVENT":
+            if not vorfiltern or vevent_im_fenster(block, fenster_start, fenster_ende):
+                vevents.append(block)
+        elif name == "VTIMEZONE":
+            zeitzonen.extend(block)
+        elif name == "VCALENDAR":
+            kopf = block
+    return FeedBloecke(kopf, zeitzonen, vevents)
+
+
+def vereinige_feeds(feeds: List[FeedBloecke]) -> FeedBloecke:
+    """
+    Mehrere Quellen als ein Feed: Kopf der ersten Quelle, jede VTIMEZONE (nach TZID) einmal,
+    VEVENT-Blöcke in Quellen-Reihenfolge. Gleiche UIDs landen so in derselben Serie, deren
+    Hash-Schlüssel (UID, Start) quellenübergreifende Duplikate entfernt.
+    """
+    if len(feeds) == 1:
+        return feeds[0]
+    zeitzonen: List[bytes] = []
+    tzids: set[bytes] = set()
+    vevents: List[List[bytes]] = []
+    for feed in feeds:
+        for name, block in iter_bloecke([b"BEGIN:VCALENDAR", *feed.zeitzonen, b"END:VCALENDAR"]):
+            if name != "VTIMEZONE":
+                continue
+            tzid = next((zerlege_zeile(z)[2].strip() for z in block if z[:5].upper() in (b"TZID:", b"TZID;")), b"")
+            if tzid not in tzids:
+                tzids.add(tzid)
+                zeitzonen.extend(block)
+        vevents.extend(feed.vevents)
+    return FeedBloecke(feeds[0].kopf, zeitzonen, vevents)
+
+
+def parse_bloecke(feed: FeedBloecke, bloecke: Iterable[List[bytes]]) -> List[Any]:
+    """
+    Parst die angegebenen VEVENT-Blöcke als Mini-Kalender (Kopf + VTIMEZONEs + Blöcke);
+    mit KALENDER_PARSER=leicht ohne icalendar-Objektbaum (LeichterTermin je Block).
+    """
+    if PARSER_LEICHT:
+        with METRIKEN.stufe("parse"):
+            registriere_zeitzonen(feed.zeitzonen)
+            return [LeichterTermin(block) for block in bloecke]
+    zeilen = [zeile for block in bloecke for zeile in block]
+    mini = b"\r\n".join([b"BEGIN:VCALENDAR", *feed.kopf, *feed.zeitzonen, *zeilen, b"END:VCALENDAR", b""])
+    with METRIKEN.stufe("parse"):
+        kalender = Calendar.from_ical(mini)
+    with METRIKEN.stufe("walk"):
+        return list(kalender.walk("VEVENT"))
+
+
+_TEXT_ESCAPES = re.compile(rb"\\([\\;,nN])")
+
+
+def block_uid(block: List[bytes]) -> str:
+    """UID eines VEVENT-Blocks aus dem Rohtext (ohne icalendar), wie sie der Parser liefert."""
+    tiefe = 0
+    for zeile in block[1:-1]:
+        oben = zeile[:6].upper()
+        if oben == b"BEGIN:":
+            tiefe += 1
+        elif oben[:4] == b"END:":
+            tiefe -= 1
+        elif not tiefe and oben[:3] == b"UID" and zeile[3:4] in (b":", b";"):
+            wert = zerlege_zeile(zeile)[2]
+            wert = _TEXT_ESCAPES.sub(lambda m: b"\n" if m.group(1) in b"nN" else m.group(1), wert)
+            return wert.decode("utf-8", "replace").strip()
+    return ""
+
+
+# ----------------------------- Leichter Parser (Backend) -----------------------------
+
+# Properties mit TZID-Parameter (wie bei icalendar)
+_DATUMS_PROPERTIES = frozenset({"DTSTART", "DTEND", "RECURRENCE-ID", "DUE", "RDATE", "EXDATE"})
+_ZEITZONEN_REGISTRIERT: set[bytes] = set()
+
+
+def registriere_zeitzonen(zeitzonen: List[bytes]) -> None:
+    """
+    Meldet die VTIMEZONEs eines Feeds einmal bei icalendar an (tzp-Cache), damit TZIDs im
+    leichten Parser genau wie bei icalendar aufgelöst werden.
+    """
+    schluessel = hashlib.sha1(b"\n".join(zeitzonen)).digest()
+    if schluessel in _ZEITZONEN_REGISTRIERT:
+        return
+    if zeitzonen:
+        Calendar.from_ical(b"\r\n".join([b"BEGIN:VCALENDAR", *zeitzonen, b"END:VCALENDAR", b""]))
+    _ZEITZONEN_REGISTRIERT.add(schluessel)
+
+
+def _parameter(roh: bytes) -> Dict[str, str]:
+    """Property-Parameter (;NAME=Wert, Anführungszeichen entfernt) als Dict mit Großbuchstaben-Namen."""
+    parameter: Dict[str, str] = {}
+    if not roh:
+        return parameter
+    teile = []
+    in_quotes = False
+    anfang = 0
+    for i, c in enumerate(roh):
+        if c == 0x22:
+            in_quotes = not in_quotes
+        elif c == 0x3B and not in_quotes:
+            teile.append(roh[anfang:i])
+            anfang = i + 1
+    teile.append(roh[anfang:])
+    for teil in teile:
+        name, _, wert = teil.partition(b"=")
+        parameter[name.strip().upper().decode("ascii", "replace")] = wert.strip(b'"').decode("utf-8", "replace")
+    return parameter
+
+
+def _text(wert: bytes) -> str:
+    return _TEXT_ESCAPES.sub(lambda m: b"\n" if m.group(1) in b"nN" else m.group(1), wert).decode("utf-8", "replace")
+
+
+def _zeitpunkt(wert: str, tzid: str | None, nur_datum: bool) -> date | datetime:
+    """DATE bzw. DATE-TIME (lokal, UTC oder mit TZID über icalendars Zeitzonen-Provider)."""
+    if nur_datum or len(wert) == 8:
+        return date(int(wert[0:4]), int(wert[4:6]), int(wert[6:8]))
+    if len(wert) < 15 or wert[8] != "T" or wert[15:] not in ("", "Z"):
+        raise ValueError(f"Ungültiger Zeitwert: {wert}")
+    dt = datetime(int(wert[0:4]), int(wert[4:6]), int(wert[6:8]), int(wert[9:11]), int(wert[11:13]), int(wert[13:15]))
+    if tzid:
+        tz = tzp.timezone(tzid)
+        if tz is not None:
+            return tzp.localize(dt, tz)
+    if wert[15:] == "Z":
+        return tzp.localize_utc(dt)
+    return dt
+
+
+def _dauer(wert: str) -> timedelta:
+    m = _DURATION_RE.match(wert.strip())
+    if not m:
+        raise ValueError(f"Ungültige Dauer: {wert}")
+    w, d, h, mi, sek = (int(x) if x else 0 for x in m.groups()[1:])
+    dauer = timedelta(weeks=w, days=d, hours=h, minutes=mi, seconds=sek)
+    return -dauer if m.group(1) == "-" else dauer
+
+
+class LeichterWert:
+    """Property-Wert mit der Schnittstelle, die die Verarbeitung von icalendar nutzt (.dt, .dts, .params)."""
+
+    __slots__ = ("dt", "dts", "params", "_roh")
+
+    def __init__(self, dt: Any, params: Dict[str, str], dts: List[LeichterWert] | None = None, roh: bytes = b"") -> None:
+        self.dt = dt
+        self.dts = dts if dts is not None else []
+        self.params = params
+        self._roh = roh
+
+    def to_ical(self) -> bytes:
+        return self._roh
+
+
+def _dekodiere(name: str, zeile: bytes) -> Any:
+    """Dekodiert eine Inhaltszeile; Fehler → ValueError (die Property gilt dann als nicht vorhanden)."""
+    _, params_roh, wert_roh = zerlege_zeile(zeile)
+    if name in ("SUMMARY", "LOCATION", "UID", "STATUS", "DESCRIPTION"):
+        return _text(wert_roh)
+    params = _parameter(params_roh)
+    if name == "SEQUENCE":
+        return int(wert_roh)
+    if name == "RRULE":
+        return LeichterWert(None, params, roh=wert_roh.strip())
+    if name == "DURATION":
+        return LeichterWert(_dauer(wert_roh.decode("ascii")), params)
+    if name in _DATUMS_PROPERTIES:
+        tzid = params.get("TZID")
+        art = params.get("VALUE", "").upper()
+        werte = []
+        for teil in wert_roh.decode("ascii").split(","):
+            if art == "PERIOD" or "/" in teil:
+                von, _, bis = teil.partition("/")
+                start = _zeitpunkt(von, tzid, False)
+                dt: Any = (start, _dauer(bis) if bis[:1] in ("P", "+", "-") else _zeitpunkt(bis, tzid, False))
+            else:
+                dt = _zeitpunkt(teil, tzid, art == "DATE")
+            werte.append(LeichterWert(dt, params))
+        if name in ("RDATE", "EXDATE"):
+            return LeichterWert(None, params, dts=werte)
+        if len(werte) != 1:
+            raise ValueError(f"{name}: genau ein Wert erwartet")
+        return werte[0]
+    return _text(wert_roh)
+
+
+class LeichterTermin:
+    """
+    VEVENT aus einem Rohblock: Inhaltszeilen werden nur nach Property-Namen einsortiert und erst
+    beim ersten get() dekodiert. Mehrfach vorkommende Properties liefern – wie bei icalendar –
+    eine Liste; Unterkomponenten (VALARM) werden übersprungen.
+    """
+
+    __slots__ = ("_zeilen", "_werte")
+
+    def __init__(self, block: List[bytes]) -> None:
+        zeilen: Dict[str, List[bytes]] = {}
+        tiefe = 0
+        for zeile in block[1:-1]:
+            oben = zeile[:6].upper()
+            if oben == b"BEGIN:":
+                tiefe += 1
+            elif oben[:4] == b"END:":
+                tiefe -= 1
+            elif not tiefe:
+                ende = len(zeile)
+                for trenner in (b";", b":"):
+                    pos = zeile.find(trenner, 0, ende)
+                    if pos >= 0:
+                        ende = pos
+                zeilen.setdefault(zeile[:ende].upper().decode("ascii", "replace"), []).append(zeile)
+        self._zeilen = zeilen
+        self._werte: Dict[str, Any] = {}
+
+    def get(self, name: str, default: Any = None) -> Any:
+        schluessel = name.upper()
+        if schluessel in self._werte:
+            wert = self._werte[schluessel]
+        else:
+            wert = None
+            roh = self._zeilen.get(schluessel)
+            if roh is not None:
+                werte = []
+                for zeile in roh:
+                    if schluessel == "RDATE" and not zerlege_zeile(zeile)[2]:
+                        continue  # leeres RDATE ignorieren (wie icalendar)
+                    try:
+                        werte.append(_dekodiere(schluessel, zeile))
+                    except (ValueError, IndexError):
+                        pass
+                if werte:
+                    wert = werte[0] if len(werte) == 1 else werte
+            self._werte[schluessel] = wert
+        return default if wert is None else wert
+
+
+# ----------------------------- Leitplanken (Expansion) -----------------------------
+
+class GrenzeUeberschritten(Exception):
+    """Eine Serie hat eine Grenze überschritten; grund: iterationen, vorkommen, zeit oder budget."""
+
+    def __init__(self, grund: str) -> None:
+        super().__init__(grund)
+        self.grund = grund
+
+
+class Waechter:
+    """
+    Grenzen je Serie (RRULE-Iterationen, Vorkommen im Fenster, Millisekunden) und das Zeitbudget
+    eines Builds. Die Zeitgrenze greift per SIGALRM auch mitten in dateutil (unmögliche Regeln
+    iterieren dort ohne ein einziges Vorkommen); ohne Signal (Nebenthread, Windows) kooperativ
+    über die Iterationszählung.
+    """
+
+    def __init__(self) -> None:
+        self.build_ende = perf_counter() + BUILD_BUDGET if BUILD_BUDGET > 0 else float("inf")
+        self.serie_ende = self.build_ende
+        self.iterationen = 0
+        self.vorkommen = 0
+        self._alarm = False
+        self._signal = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+        if self._signal:
+            signal.signal(signal.SIGALRM, self._bei_alarm)
+
+    def _bei_alarm(self, signum, frame) -> None:
+        self._alarm = True
+        raise GrenzeUeberschritten("zeit")
+
+    def budget_erschoepft(self) -> bool:
+        return perf_counter() >= self.build_ende
+
+    @contextmanager
+    def serie(self) -> Iterator[None]:
+        """Setzt die Zähler zurück und überwacht die Laufzeit einer Serie."""
+        self.iterationen = self.vorkommen = 0
+        self._alarm = False
+        jetzt = perf_counter()
+        self.serie_ende = min(jetzt + MAX_MS_SERIE / 1000, self.build_ende) if MAX_MS_SERIE > 0 else self.build_ende
+        armiert = self._signal and self.serie_ende != float("inf")
+        if armiert:
+            signal.setitimer(signal.ITIMER_REAL, max(self.serie_ende - jetzt, 0.001))
+        try:
+            yield
+        finally:
+            if armiert:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        # Ein allgemeines "except Exception" unterwegs kann den Alarm geschluckt haben
+        if self._alarm:
+            raise GrenzeUeberschritten("zeit")
+
+    def iteration(self) -> None:
+        self.iterationen += 1
+        if MAX_ITERATIONEN > 0 and self.iterationen > MAX_ITERATIONEN:
+            raise GrenzeUeberschritten("iterationen")
+        if not self.iterationen & 0x3FF and perf_counter() >= self.serie_ende:
+            raise GrenzeUeberschritten("zeit")
+
+    def vorkommen_zaehlen(self) -> None:
+        self.vorkommen += 1
+        if MAX_VORKOMMEN > 0 and self.vorkommen > MAX_VORKOMMEN:
+            raise GrenzeUeberschritten("vorkommen")
+
+
+# ----------------------------- Wiederholungen (RRULE-Expansion) -----------------------------
+
+_WOCHENTAGE = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+_BYDAY_RE = re.compile(r"^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$")
+# Regelteile, die der Schnellpfad auswerten kann – alles andere geht an dateutil
+_SCHNELL_TEILE = {"FREQ", "INTERVAL", "UNTIL", "WKST", "BYDAY", "BYMONTHDAY", "BYHOUR", "BYMINUTE"}
+
+
+def _ceil_div(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+def _monatstage(jahr: int, monat: int, bymonthday: List[int], byday: List[Tuple[int | None, int]], default_tag: int) -> List[int]:
+    """Kandidatentage eines Monats (dateutil-Semantik: ungültige Tage entfallen, kein Clamping)."""
+    letzter = (date(jahr + monat // 12, monat % 12 + 1, 1) - timedelta(days=1)).day
+    if bymonthday:
+        tage = {t if t > 0 else letzter + 1 + t for t in bymonthday}
+    elif byday:
+        erster_wt = date(jahr, monat, 1).weekday()
+        tage = set()
+        for n, wt in byday:
+            alle = list(range(1 + (wt - erster_wt) % 7, letzter + 1, 7))
+            if n is None:
+                tage.update(alle)
+            elif -len(alle) <= n <= len(alle) and n != 0:
+                tage.add(alle[n - 1] if n > 0 else alle[n])
+    else:
+        tage = {default_tag}
+    return sorted(t for t in tage if 1 <= t <= letzter)
+
+
+class _SchnellPlan(NamedTuple):
+    freq: str
+    interval: int
+    byday: List[Tuple[int | None, int]]
+    bymonthday: List[int]
+    byhour: List[int]
+    byminute: List[int]
+    until: datetime | None
+    wkst: int
+
+
+def _schnell_plan(rrule_text: str, start_local: datetime) -> _SchnellPlan | None:
+    """
+    Zerlegt einfache FREQ=DAILY/WEEKLY/MONTHLY-Regeln für den Schnellpfad.
+    Rückgabe None = Regel nicht unterstützt (Fallback auf dateutil).
+    """
+    teile: Dict[str, str] = {}
+    for teil in rrule_text.upper().split(";"):
+        key, _, wert = teil.partition("=")
+        if key not in _SCHNELL_TEILE or key in teile:
+            return None
+        teile[key] = wert
+
+    freq = teile.get("FREQ")
+    if freq not in ("DAILY", "WEEKLY", "MONTHLY"):
+        return None
+    try:
+        interval = int(teile.get("INTERVAL", "1"))
+        bymonthday = [int(x) for x in teile["BYMONTHDAY"].split(",")] if "BYMONTHDAY" in teile else []
+        byhour = sorted({int(x) for x in teile["BYHOUR"].split(",")}) if "BYHOUR" in teile else [start_local.hour]
+        byminute = sorted({int(x) for x in teile["BYMINUTE"].split(",")}) if "BYMINUTE" in teile else [start_local.minute]
+    except ValueError:
+        return None
+    if interval < 1 or any(t == 0 or abs(t) > 31 for t in bymonthday):
+        return None
+    if not all(0 <= h <= 23 for h in byhour) or not all(0 <= m <= 59 for m in byminute):
+        return None
+
+    byday: List[Tuple[int | None, int]] = []
+    for eintrag in filter(None, teile.get("BYDAY", "").split(",")):
+        m = _BYDAY_RE.match(eintrag)
+        if not m:
+            return None
+        byday.append((int(m.group(1)) if m.group(1) else None, _WOCHENTAGE[m.group(2)]))
+    if freq != "MONTHLY" and (bymonthday or any(n is not None for n, _ in byday)):
+        return None
+    if freq == "MONTHLY" and (bymonthday and byday or len({n is None for n, _ in byday}) > 1):
+        # dateutil bildet hier Schnittmengen statt Vereinigungen – nicht nachbauen
+        return None
+
+    until: datetime | None = None
+    if "UNTIL" in teile:
+        # Nur UTC-UNTIL: bei naivem UNTIL + aware DTSTART soll dateutil wie bisher entscheiden
+        if not re.fullmatch(r"\d{8}T\d{6}Z", teile["UNTIL"]):
+            return None
+        until = datetime.strptime(teile["UNTIL"], "%Y%m%dT%H%M%SZ").replace(tzinfo=ZoneInfo("UTC"))
+
+    wkst = _WOCHENTAGE.get(teile.get("WKST", "MO"))
+    if wkst is None:
+        return None
+    return _SchnellPlan(freq, interval, byday, bymonthday, byhour, byminute, until, wkst)
+
+
+def _schnell_vorkommen(
+    plan: _SchnellPlan,
+    start_local: datetime,
+    search_start: datetime,
+    search_end: datetime,
+) -> List[datetime]:
+    """
+    Geschlossene Berechnung: springt per Arithmetik direkt zur ersten Periode im Suchfenster
+    statt ab DTSTART zu iterieren. Wandzeit + tzinfo wie bei dateutil → Sommer-/Winterzeit
+    (Europe/Vienna) bleibt korrekt.
+    """
+    freq, interval, byday, bymonthday, byhour, byminute, until, wkst = plan
+    tz = start_local.tzinfo
+    d0 = start_local.date()
+    # Wandzeit-Fenster großzügig auf Tage gerundet; die exakte Prüfung folgt pro Vorkommen
+    lo = max(d0, search_start.astimezone(tz).date() - timedelta(days=1))
+    hi = search_end.astimezone(tz).date() + timedelta(days=1)
+    if until is not None:
+        hi = min(hi, until.astimezone(tz).date() + timedelta(days=1))
+    if lo > hi:
+        return []
+
+    tage: List[date] = []
+    if freq == "DAILY":
+        wochentage = {wt for _, wt in byday}
+        tag = d0 + timedelta(days=_ceil_div((lo - d0).days, interval) * interval)
+        while tag <= hi:
+            if not wochentage or tag.weekday() in wochentage:
+                tage.append(tag)
+            tag += timedelta(days=interval)
+    elif freq == "WEEKLY":
+        offsets = sorted({(wt - wkst) % 7 for _, wt in byday} or {(d0.weekday() - wkst) % 7})
+        w0 = d0 - timedelta(days=(d0.weekday() - wkst) % 7)
+        k = _ceil_div(max((lo - w0).days // 7, 0), interval) * interval
+        woche = w0 + timedelta(weeks=k)
+        while woche <= hi:
+            tage.extend(woche + timedelta(days=o) for o in offsets)
+            woche += timedelta(weeks=interval)
+    else:
+        m0 = d0.year * 12 + d0.month - 1
+        k = _ceil_div(max(lo.year * 12 + lo.month - 1 - m0, 0), interval) * interval
+        idx = m0 + k
+        while idx <= hi.year * 12 + hi.month - 1:
+            jahr, monat = divmod(idx, 12)
+            tage.extend(date(jahr, monat + 1, t) for t in _monatstage(jahr, monat + 1, bymonthday, byday, d0.day))
+            idx += interval
+
+    ergebnis: List[datetime] = []
+    for tag in tage:
+        if not (lo <= tag <= hi):
+            continue
+        for h in byhour:
+            for mi in byminute:
+                occ = datetime.combine(tag, time(h, mi, start_local.second), tzinfo=tz)
+                if occ < start_local or (until is not None and occ > until):
+                    continue
+                if search_start <= occ <= search_end:
+                    ergebnis.append(occ)
+    ergebnis.sort()
+    return ergebnis
+
+
+def _rrule_schnell(
+    rrule_text: str,
+    start_local: datetime,
+    search_start: datetime,
+    search_end: datetime,
+) -> List[datetime] | None:
+    """Schnellpfad ohne Cache; None = Regel nicht unterstützt."""
+    plan = _schnell_plan(rrule_text, start_local)
+    if plan is None:
+        return None
+    return _schnell_vorkommen(plan, start_local, search_start, search_end)
+
+
+# dateutil-Standardwerte, die sonst implizit aus DTSTART kämen (für Checkpoint-Neustarts)
+_CHECKPOINT_VERBOTEN = {"COUNT", "BYWEEKNO", "BYYEARDAY", "BYEASTER"}
+
+
+def _regel_mit_standardwerten(rrule_text: str, start_local: datetime) -> str | None:
+    """
+    Schreibt die aus DTSTART abgeleiteten Standardwerte (BYDAY/BYMONTHDAY/BYMONTH/BYHOUR/…)
+    explizit in die Regel, damit sie ab einem späteren Vorkommen identisch weiterläuft.
+    None = Regel kann nicht sicher ab einem Checkpoint fortgesetzt werden.
+    """
+    teile = {k: v for k, _, v in (t.partition("=") for t in rrule_text.upper().split(";"))}
+    freq = teile.get("FREQ")
+    if freq not in ("YEARLY", "MONTHLY", "WEEKLY", "DAILY") or _CHECKPOINT_VERBOTEN & teile.keys():
+        return None
+    if not ({"BYMONTHDAY", "BYDAY"} & teile.keys()):
+        if freq == "YEARLY":
+            teile.setdefault("BYMONTH", str(start_local.month))
+            teile["BYMONTHDAY"] = str(start_local.day)
+        elif freq == "MONTHLY":
+            teile["BYMONTHDAY"] = str(start_local.day)
+        elif freq == "WEEKLY":
+            teile["BYDAY"] = list(_WOCHENTAGE)[start_local.weekday()]
+    teile.setdefault("BYHOUR", str(start_local.hour))
+    teile.setdefault("BYMINUTE", str(start_local.minute))
+    teile.setdefault("BYSECOND", str(start_local.second))
+    return ";".join(f"{k}={v}" for k, v in teile.items())
+
+
+class RegelCache:
+    """
+    Cache für RRULEs, Schlüssel (Regeltext, DTSTART, TZ).
+    Im Speicher: geparste Schnellpfad-Pläne und kompilierte dateutil-Regeln, geteilt über
+    Komponenten mit identischer Regel. Persistent (JSON): Serienende und Checkpoint
+    „erstes Vorkommen ab T“, damit dateutil nicht jede Woche ab DTSTART iteriert.
+    Einträge von Serien, die der Termin-Index überspringt, bleiben beim Speichern erhalten, bis sie
+    REGEL_CACHE_TAGE lang nicht mehr genutzt wurden (Datum der letzten Nutzung je Eintrag).
+    """
+
+    def __init__(self, pfad: str) -> None:
+        self.pfad = pfad
+        self._vorher = lade_json(pfad)
+        self._eintraege: Dict[str, Dict[str, str]] = {}
+        self._kompiliert: Dict[str, Any] = {}
+        self._heute = jetzt(ZoneInfo("UTC")).date()
+
+    @staticmethod
+    def schluessel(rrule_text: str, start_local: datetime) -> str:
+        roh = f"{rrule_text}|{start_local.isoformat()}|{start_local.tzinfo}"
+        return hashlib.sha1(roh.encode("utf-8")).hexdigest()
+
+    def eintrag(self, key: str) -> Dict[str, str]:
+        eintrag = self._eintraege.get(key)
+        if eintrag is None:
+            alt = self._vorher.get(key)
+            eintrag = self._eintraege[key] = dict(alt) if isinstance(alt, dict) else {}
+        eintrag["genutzt"] = self._heute.isoformat()
+        return eintrag
+
+    def kompiliert(self, key: str, erzeugen: Callable[[], Any]) -> Any:
+        if key not in self._kompiliert:
+            self._kompiliert[key] = erzeugen()
+        return self._kompiliert[key]
+
+    def speichern(self) -> None:
+        self._vorher.update(self._eintraege)
+        # Einträge ohne Nutzungsdatum (ältere Cache-Dateien) gelten ab heute als genutzt
+        heute = self._heute.isoformat()
+        grenze = (self._heute - timedelta(days=REGEL_CACHE_TAGE)).isoformat()
+        veraltet = {
+            k for k, e in self._vorher.items()
+            if not isinstance(e, dict) or e.setdefault("genutzt", heute) < grenze
+        }
+        for k in veraltet:
+            del self._vorher[k]
+            self._eintraege.pop(k, None)
+        if veraltet:  # Daemon: kompilierte Regeln der entfernten Einträge ebenfalls verwerfen
+            self._kompiliert = {k: v for k, v in self._kompiliert.items() if k.partition(":")[2] not in veraltet}
+        speichere_json(self.pfad, self._vorher)
+        self._heute = jetzt(ZoneInfo("UTC")).date()  # Daemon: nächster Durchgang
+
+
+def serien_ende(
+    rrule_text: str, start_local: datetime, cache: RegelCache, waechter: Waechter | None = None
+) -> datetime | None:
+    """
+    Letztmöglicher Serienstart: UNTIL direkt, COUNT einmalig aufgelöst und im Cache gemerkt.
+    None = offene Serie (oder UNTIL-Form, über die dateutil wie bisher entscheiden soll).
+    Eine leere COUNT-Serie liefert datetime.min (UTC) – sie erreicht kein Fenster.
+    """
+    teile = {k: v for k, _, v in (t.partition("=") for t in rrule_text.upper().split(";"))}
+    if "UNTIL" in teile:
+        if re.fullmatch(r"\d{8}T\d{6}Z", teile["UNTIL"]):
+            return datetime.strptime(teile["UNTIL"], "%Y%m%dT%H%M%SZ").replace(tzinfo=ZoneInfo("UTC"))
+        return None
+    if "COUNT" not in teile:
+        return None
+
+    eintrag = cache.eintrag(RegelCache.schluessel(rrule_text, start_local))
+    if "ende" not in eintrag:
+        letztes = None
+        for letztes in rrulestr(rrule_text, dtstart=start_local):
+            if waechter is not None:
+                waechter.iteration()
+        eintrag["ende"] = letztes.isoformat() if letztes is not None else ""
+    wert = eintrag["ende"]
+    return datetime.fromisoformat(wert) if wert else datetime.min.replace(tzinfo=ZoneInfo("UTC"))
+
+
+def roh_datum(v: date | datetime) -> date:
+    """Kalendertag eines ICS-Werts ohne Zeitzonen-Umrechnung (für grobe Fensterprüfungen)."""
+    return v.date() if isinstance(v, datetime) else v
+
+
+def _zwischen(rule, search_start: datetime, search_end: datetime, waechter: Waechter | None) -> List[datetime]:
+    """rule.between(search_start, search_end, inc=True), mit Wächter Iteration für Iteration."""
+    if waechter is None:
+        return rule.between(search_start, search_end, inc=True)
+    vorkommen = []
+    for occ in rule:
+        waechter.iteration()
+        if occ > search_end:
+            break
+        if occ >= search_start:
+            vorkommen.append(occ)
+    return vorkommen
+
+
+def _naechstes(rule, ab: datetime, waechter: Waechter | None) -> datetime | None:
+    """rule.after(ab, inc=True), mit Wächter Iteration für Iteration."""
+    if waechter is None:
+        return rule.after(ab, inc=True)
+    for occ in rule:
+        waechter.iteration()
+        if occ >= ab:
+            return occ
+    return None
+
+
+def expandiere_rrule(
+    rrule_text: str,
+    start_local: datetime,
+    search_start: datetime,
+    search_end: datetime,
+    cache: RegelCache | None = None,
+    waechter: Waechter | None = None,
+) -> List[datetime]:
+    """
+    Vorkommen einer RRULE im Fenster [search_start, search_end] (inklusiv).
+    Mit Cache setzt dateutil beim letzten Checkpoint („erstes Vorkommen ab T“, T ≤ search_start) auf.
+    Mit Wächter zählt jede dateutil-Iteration gegen die Grenzen der Serie.
+    """
+    if cache is None:
+        schnell = _rrule_schnell(rrule_text, start_local, search_start, search_end)
+        if schnell is not None:
+            return schnell
+        return _zwischen(rrulestr(rrule_text, dtstart=start_local), search_start, search_end, waechter)
+
+    key = RegelCache.schluessel(rrule_text, start_local)
+    plan = cache.kompiliert(f"plan:{key}", lambda: _schnell_plan(rrule_text, start_local))
+    if plan is not None:
+        return _schnell_vorkommen(plan, start_local, search_start, search_end)
+
+    eintrag = cache.eintrag(key)
+    rule = None
+    if "t" in eintrag and datetime.fromisoformat(eintrag["t"]) <= search_start:
+        if not eintrag["n"]:
+            return []  # nach T gibt es kein Vorkommen mehr
+        checkpoint = datetime.fromisoformat(eintrag["n"]).astimezone(start_local.tzinfo)
+        fortsetzbar = cache.kompiliert(f"std:{key}", lambda: _regel_mit_standardwerten(rrule_text, start_local))
+        if fortsetzbar is not None and checkpoint > start_local:
+            rule = rrulestr(fortsetzbar, dtstart=checkpoint)
+    if rule is None:
+        rule = cache.kompiliert(f"rule:{key}", lambda: rrulestr(rrule_text, dtstart=start_local))
+    vorkommen = _zwischen(rule, search_start, search_end, waechter)
+
+    if "t" not in eintrag or datetime.fromisoformat(eintrag["t"]) < search_start:
+        naechstes = vorkommen[0] if vorkommen else _naechstes(rule, search_start, waechter)
+        eintrag["t"] = search_start.isoformat()
+        eintrag["n"] = naechstes.isoformat() if naechstes is not None else ""
+    return vorkommen
+
+
 # -------------------------- Termin in Wochenstruktur schreiben --------------------------
 
+# Art der Zeitangabe je Tag (statt vorformatiertem Text)
+ART_ZEITRAUM = 0         # "09:00 – 10:00"
+ART_GANZTAG = 1          # "Ganztägig"
+ART_START = 2            # "Start: 15:00"
+ART_ENDE = 3             # "Ende: 10:00"
+ART_BIS_MITTERNACHT = 4  # "22:00 – 00:00"
+
+
+class Vorkommen:
+    """Kompakter Eintrag je Termin und Tag: Epoch-Sekunden, Minuten des Tages, internierte Texte."""
+
+    __slots__ = ("start", "von", "bis", "art", "summary", "location")
+
+    def __init__(self, start: int, von: int, bis: int, art: int, summary: str, location: str) -> None:
+        self.start = start        # Epoch-Sekunden (Sortierung)
+        self.von = von            # Startzeit lokal in Minuten seit 00:00
+        self.bis = bis            # Endzeit lokal in Minuten seit 00:00
+        self.art = art
+        self.summary = summary    # bereits HTML-escaped
+        self.location = location  # roh, wird beim Rendern escaped
+
+    @property
+    def is_all_day(self) -> bool:
+        return self.art == ART_GANZTAG
+
+    def zeit_text(self) -> str:
+        def hhmm(m: int) -> str:
+            return f"{m // 60:02d}:{m % 60:02d}"
+
+        if self.art == ART_GANZTAG:
+            return "Ganztägig"
+        if self.art == ART_START:
+            return f"Start: {hhmm(self.von)}"
+        if self.art == ART_ENDE:
+            return f"Ende: {hhmm(self.bis)}"
+        if self.art == ART_BIS_MITTERNACHT:
+            return f"{hhmm(self.von)} – 00:00"
+        return f"{hhmm(self.von)} – {hhmm(self.bis)}"
+
+
+def epoch(dt: datetime) -> int:
+    return int(dt.timestamp())
+
+
 def add_event_local(
-    week_events: Dict[date, List[Dict[str, Any]]],
+    week_events: Dict[date, List[Vorkommen]],
     component,
     start_local: datetime,
     end_local: datetime,
     summary: str,
     location: str,
     week_days_local: set[date],
-    event_uid: str | None,
 ) -> None:
     """Fügt ein (ggf. mehrtägiges) Ereignis allen betroffenen lokalen Tagen hinzu."""
     all_day = is_all_day_component(component)
@@ -81,50 +1580,589 @@ def add_event_local(
         end_local.time() == time.min and end_local.date() > start_local.date()
     )
 
+    start = epoch(start_local)
+    von = start_local.hour * 60 + start_local.minute
+    bis = end_local.hour * 60 + end_local.minute
+    summary = sys.intern(summary)
+    location = sys.intern(location)
+
     current = start_local.date()
     while current <= loop_end_date:
         if current in week_days_local:
             if all_day:
-                time_str = "Ganztägig"
-                is_all = True
+                art = ART_GANZTAG
+            elif same_day:
+                art = ART_ZEITRAUM
+            elif ends_midnight_next and current == start_local.date():
+                # 24h-Block: 00:00 – 00:00 → Ganztägig
+                art = ART_GANZTAG if von == 0 else ART_BIS_MITTERNACHT
+            elif current == start_local.date():
+                art = ART_START
+            elif current == loop_end_date and end_local.time() > time.min:
+                art = ART_ENDE
             else:
-                if same_day:
-                    time_str = f"{start_local:%H:%M} – {end_local:%H:%M}"
-                elif ends_midnight_next and current == start_local.date():
-                    # 24h-Block: 00:00 – 00:00 → Ganztägig
-                    time_str = "Ganztägig" if start_local.time() == time.min else f"{start_local:%H:%M} – 00:00"
-                elif current == start_local.date():
-                    time_str = f"Start: {start_local:%H:%M}"
-                elif current == loop_end_date and end_local.time() > time.min:
-                    time_str = f"Ende: {end_local:%H:%M}"
-                else:
-                    time_str = "Ganztägig"
-                is_all = (time_str == "Ganztägig")
-
-            event_data = {
-                "summary": summary,
-                "location": location,
-                "time": time_str,
-                "is_all_day": is_all,
-                "start_time": start_local,  # für Sortierung
-            }
-            if event_uid:
-                event_data["uid"] = event_uid
-            week_events[current].append(event_data)
+                art = ART_GANZTAG
+            week_events[current].append(Vorkommen(start, von, bis, art, summary, location))
         current += timedelta(days=1)
 
 
+# ------------------------------ Termine expandieren (Serien-Index) ------------------------------
+
+def termin_zeiten(component, tz_local: ZoneInfo) -> Tuple[datetime, datetime]:
+    """Start/Ende lokal aus DTSTART und DTEND bzw. DURATION (fehlt beides: Ende = Start)."""
+    dtstart_raw = component.get("dtstart").dt
+    start_local = to_local(dtstart_raw, tz_local)
+    dtend_prop = component.get("dtend")
+    duration_prop = component.get("duration")
+    if not dtend_prop and duration_prop:
+        return start_local, start_local + duration_prop.dt
+    dtend_raw = dtend_prop.dt if dtend_prop else dtstart_raw
+    return start_local, to_local(dtend_raw, tz_local)
+
+
+def roh_spanne(component) -> Tuple[date, date]:
+    """Erster/letzter Kalendertag eines Termins auf Rohwerten (ohne Zeitzonen-Umrechnung)."""
+    dtstart_raw = component.get("dtstart").dt
+    dtend_prop = component.get("dtend")
+    duration_prop = component.get("duration")
+    if not dtend_prop and duration_prop:
+        ende_raw = dtstart_raw + duration_prop.dt
+    else:
+        ende_raw = dtend_prop.dt if dtend_prop else dtstart_raw
+    return roh_datum(dtstart_raw), roh_datum(ende_raw)
+
+
+class Serie:
+    """
+    Alle Komponenten einer UID: Master-Termine, Overrides (RECURRENCE-ID) und Absagen.
+    Je RECURRENCE-ID gewinnt die höchste SEQUENCE (bei Gleichstand die spätere im Feed).
+    """
+
+    __slots__ = ("uid", "masters", "overrides", "absagen", "_ids", "_rec_tage", "_rec_werte")
+
+    def __init__(self, uid: str = "") -> None:
+        self.uid = uid
+        self.masters: List[Any] = []
+        self.overrides: Dict[Any, Tuple[int, Any]] = {}  # RECURRENCE-ID roh → (SEQUENCE, Komponente)
+        self.absagen: set[int] = set()                   # Dedup-Schlüssel abgesagter Vorkommen
+        self._ids: Dict[str, int] = {}
+        self._rec_tage: List[date] | None = None         # sortiert, für bisect
+        self._rec_werte: List[Any] = []
+
+    def schluessel(self, dedup_id: str, occ_start_local: datetime) -> int:
+        # De-Duping über (UID oder summary|location, Startzeit) als ganzzahliger Schlüssel:
+        # laufende Nummer der Kennung << 40 | Epoch-Sekunden
+        nr = self._ids.setdefault(dedup_id, len(self._ids))
+        return (nr << 40) + epoch(occ_start_local)
+
+    def override_hinzufuegen(self, rec_raw: Any, component) -> None:
+        try:
+            sequence = int(component.get("sequence") or 0)
+        except (TypeError, ValueError):
+            sequence = 0
+        alt = self.overrides.get(rec_raw)
+        if alt is None or sequence >= alt[0]:
+            self.overrides[rec_raw] = (sequence, component)
+            self._rec_tage = None
+
+    def erste_komponente(self) -> Any:
+        """Erster Master bzw. Override (Titel/RRULE für Berichte); None bei leerer Serie."""
+        return (self.masters or [c for _, c in self.overrides.values()] or [None])[0]
+
+    def overrides_lokal(self, lo: date, hi: date, tz_local: ZoneInfo) -> Dict[datetime, Any]:
+        """Overrides mit RECURRENCE-ID (Rohdatum) in [lo, hi], nach lokaler Startzeit."""
+        if not self.overrides:
+            return {}
+        if self._rec_tage is None:
+            paare = sorted(((roh_datum(rec), i, rec) for i, rec in enumerate(self.overrides)), key=lambda p: p[:2])
+            self._rec_tage = [p[0] for p in paare]
+            self._rec_werte = [p[2] for p in paare]
+        von = bisect_left(self._rec_tage, lo)
+        bis = bisect_right(self._rec_tage, hi)
+        recs = self._rec_werte[von:bis]
+        return {
+            lokal: self.overrides[rec][1]
+            for lokal, rec in zip(to_local_liste(recs, tz_local), recs)
+        }
+
+
+def sammle_serien(vevents: Iterable[Any], tz_local: ZoneInfo) -> Dict[str, Serie]:
+    """
+    Serien-Index (Master + Overrides + Absagen je UID). Die Reihenfolge im Feed spielt danach
+    keine Rolle mehr; UID-lose Termine landen gemeinsam unter "".
+    Abgesagte Instanzen (RECURRENCE-ID + CANCELLED) zählen erst, wenn alle Komponenten gesammelt
+    sind, und nur, wenn die Absage je RECURRENCE-ID die höchste SEQUENCE hat.
+    """
+    t0 = perf_counter()
+    serien: Dict[str, Serie] = {}
+    anzahl = absagen = 0
+
+    def absage_hinzufuegen(serie: Serie, component, anker: Any) -> None:
+        nonlocal absagen
+        summary_str = html.escape(str(component.get("summary") or "Ohne Titel"))
+        location_str = str(component.get("location") or "").strip()
+        dedup_id = serie.uid if serie.uid else f"{summary_str}|{location_str}"
+        serie.absagen.add(serie.schluessel(dedup_id, to_local(anker, tz_local)))
+        absagen += 1
+
+    for component in vevents:
+        anzahl += 1
+        summary_str = ""
+        try:
+            uid = str(component.get("uid") or "").strip()
+            status = str(component.get("status") or "").strip().upper()
+            rec_id_prop = component.get("recurrence-id")
+            serie = serien.get(uid)
+            if serie is None:
+                serie = serien[uid] = Serie(uid)
+            if rec_id_prop:
+                serie.override_hinzufuegen(rec_id_prop.dt, component)
+            elif status == "CANCELLED":
+                # Absage auf Master-Ebene: verankert an DTSTART
+                dtstart_prop = component.get("dtstart")
+                if dtstart_prop:
+                    absage_hinzufuegen(serie, component, dtstart_prop.dt)
+            else:
+                serie.masters.append(component)
+        except Exception as e:
+            print(f"Fehler beim Verarbeiten eines Termins ('{summary_str}'): {e}", file=sys.stderr)
+
+    for serie in serien.values():
+        for rec_raw, (_, component) in serie.overrides.items():
+            if str(component.get("status") or "").strip().upper() != "CANCELLED":
+                continue
+            try:
+                absage_hinzufuegen(serie, component, rec_raw)
+            except Exception as e:
+                print(f"Fehler beim Verarbeiten einer Absage ('{component.get('summary') or ''}'): {e}", file=sys.stderr)
+    METRIKEN.zaehle("vevents", anzahl)
+    METRIKEN.zaehle("absagen", absagen)
+    METRIKEN.addiere("serien", perf_counter() - t0)
+    return serien
+
+
+def melde_uebersprungen(serie: Serie, grund: str) -> None:
+    """Zählt eine wegen einer Grenze übersprungene Serie und vermerkt sie für die Metriken."""
+    erster = serie.erste_komponente()
+    summary = str(erster.get("summary") or "Ohne Titel") if erster is not None else ""
+    METRIKEN.zaehle(f"uebersprungen_{grund}")
+    METRIKEN.uebersprungen.append({"uid": serie.uid, "summary": summary, "grund": grund})
+    if grund != "budget":  # Budget: eine Sammelmeldung am Ende des Builds
+        print(
+            f"Warnung: Serie '{summary}' ({serie.uid or 'ohne UID'}) übersprungen – Grenze '{grund}' überschritten.",
+            file=sys.stderr,
+        )
+
+
+class SerienExpander:
+    """
+    Expandiert einzelne Serien in das Fenster [fenster_start_dt, fenster_ende_dt];
+    mit Wächter unter den Grenzen je Serie.
+    """
+
+    def __init__(
+        self,
+        fenster_start_dt: datetime,
+        fenster_ende_dt: datetime,
+        tage_local: set[date],
+        tz_local: ZoneInfo,
+        regel_cache: RegelCache,
+        waechter: Waechter | None = None,
+    ) -> None:
+        self.fenster_start_dt = fenster_start_dt
+        self.fenster_ende_dt = fenster_ende_dt
+        self.tage_local = tage_local
+        self.tz_local = tz_local
+        self.regel_cache = regel_cache
+        self.waechter = waechter
+        # Grobes Fenster für Prüfungen auf Rohwerten (vor jeder Zeitzonen-Umrechnung)
+        self.fenster_hi = max(tage_local) + VORFILTER_PUFFER
+        self.fenster_lo = min(tage_local) - VORFILTER_PUFFER
+
+    def expandiere(self, serie: Serie, week_events: Dict[date, List[Vorkommen]]) -> bool:
+        """
+        Expandiert eine Serie. False = wegen einer Grenze übersprungen (gemeldet); week_events
+        kann dann einen Teil ihrer Vorkommen enthalten und sollte verworfen werden.
+        """
+        if self.waechter is None:
+            self._expandiere(serie, week_events)
+            return True
+        try:
+            with self.waechter.serie():
+                self._expandiere(serie, week_events)
+            return True
+        except GrenzeUeberschritten as e:
+            melde_uebersprungen(serie, e.grund)
+            return False
+
+    def _expandiere(self, serie: Serie, week_events: Dict[date, List[Vorkommen]]) -> None:
+        """
+        Master expandieren (Overrides inline), danach verschobene Overrides ohne passende
+        Master-Instanz im Fenster; Absagen und Duplikate per Hash-Lookup.
+        """
+        fenster_start_dt, fenster_ende_dt = self.fenster_start_dt, self.fenster_ende_dt
+        fenster_lo, fenster_hi = self.fenster_lo, self.fenster_hi
+        tage_local, tz_local, regel_cache = self.tage_local, self.tz_local, self.regel_cache
+        waechter = self.waechter
+        dedup_keys: set[int] = set()
+        aufgeloest: set[int] = set()
+        t0 = perf_counter()
+        rrule_zeit = 0.0
+        vorkommen = 0
+        exdates = 0
+
+        def add_occurrence(component, occ_start_local: datetime, occ_end_local: datetime, summary_str: str) -> None:
+            nonlocal vorkommen
+            uid = str(component.get("uid") or "").strip()
+            location_str = str(component.get("location") or "").strip()
+            dedup_key = serie.schluessel(uid or f"{summary_str}|{location_str}", occ_start_local)
+            if dedup_key in serie.absagen:
+                METRIKEN.zaehle("absage_treffer")
+                return
+            if dedup_key in dedup_keys:
+                METRIKEN.zaehle("dedup_treffer")
+                return
+            dedup_keys.add(dedup_key)
+            vorkommen += 1
+            if waechter is not None:
+                waechter.vorkommen_zaehlen()
+            add_event_local(
+                week_events,
+                component,
+                occ_start_local,
+                occ_end_local,
+                summary_str,
+                location_str,
+                tage_local,
+            )
+
+        def add_override(override_component) -> None:
+            summary_str = ""
+            try:
+                status = str(override_component.get("status") or "").strip().upper()
+                if status == "CANCELLED":
+                    # Inline aufgelöst (aufgeloest) = eine Master-Instanz fällt weg
+                    if id(override_component) in aufgeloest:
+                        METRIKEN.zaehle("absage_treffer")
+                    return
+                if not override_component.get("dtstart"):
+                    return
+                summary_str = html.escape(str(override_component.get("summary") or "Ohne Titel"))
+                occ_start_local, occ_end_local = termin_zeiten(override_component, tz_local)
+                add_occurrence(override_component, occ_start_local, occ_end_local, summary_str)
+            except GrenzeUeberschritten:
+                raise
+            except Exception as e:
+                print(
+                    f"Fehler beim Verarbeiten eines Override-Termins ('{summary_str}'): {e}",
+                    file=sys.stderr,
+                )
+
+        def expandiere_master(component) -> None:
+            nonlocal rrule_zeit, exdates
+            # Titel + Ort
+            raw_summary = str(component.get("summary") or "Ohne Titel")
+            summary_str = html.escape(raw_summary)
+            if not component.get("dtstart"):
+                return
+
+            # Start/Ende (lokal)
+            start_local, end_local = termin_zeiten(component, tz_local)
+
+            # Dauer (für Suchfenster-Puffer)
+            duration = end_local - start_local
+            pad = duration if duration > timedelta(0) else timedelta(0)
+
+            # leicht nach vorne ziehen, damit Events, die am Sonntag 24h laufen, montags erscheinen
+            search_start = fenster_start_dt - pad
+            search_end = fenster_ende_dt
+            search_lo = search_start.date() - VORFILTER_PUFFER
+
+            rrule_prop = component.get("rrule")
+            rdate_prop = component.get("rdate")
+            overrides_lokal: Dict[datetime, Any] = {}
+            if rrule_prop or rdate_prop:
+                overrides_lokal = serie.overrides_lokal(search_lo, fenster_hi, tz_local)
+
+            def add_instanz(occ_start_local: datetime) -> None:
+                # Override inline auflösen: statt der Master-Instanz den verschobenen Termin ausgeben
+                override_component = overrides_lokal.get(occ_start_local)
+                if override_component is None:
+                    add_occurrence(component, occ_start_local, occ_start_local + duration, summary_str)
+                elif id(override_component) not in aufgeloest:
+                    aufgeloest.add(id(override_component))
+                    add_override(override_component)
+
+            # Wiederholungen (RRULE)
+            if rrule_prop:
+                rrule_text = rrule_prop.to_ical().decode()
+                ende = serien_ende(rrule_text, start_local, regel_cache, waechter)
+                # Beendete Serien (UNTIL/COUNT vor dem Fenster) gar nicht erst expandieren
+                if ende is None or ende >= search_start:
+                    # EXDATE sammeln (nur Werte in Fensternähe umrechnen)
+                    ex_prop = component.get("exdate")
+                    ex_list = ex_prop if isinstance(ex_prop, list) else ([ex_prop] if ex_prop else [])
+                    exdates += sum(len(ex.dts) for ex in ex_list)
+                    exdates_local = set(to_local_liste(
+                        (d.dt for ex in ex_list for d in ex.dts if search_lo <= roh_datum(d.dt) <= fenster_hi),
+                        tz_local,
+                    ))
+
+                    t_rrule = perf_counter()
+                    instanzen = expandiere_rrule(
+                        rrule_text, start_local, search_start, search_end, regel_cache, waechter
+                    )
+                    rrule_zeit += perf_counter() - t_rrule
+                    for occ_start_local in instanzen:
+                        occ_start_local = to_local(occ_start_local, tz_local)
+                        if occ_start_local not in exdates_local:
+                            add_instanz(occ_start_local)
+            else:
+                # Einzeltermin
+                add_occurrence(component, start_local, end_local, summary_str)
+
+            # Zusätzliche Einzeltermine (RDATE); bei VALUE=PERIOD zählt der Beginn der Periode
+            rdate_list = rdate_prop if isinstance(rdate_prop, list) else ([rdate_prop] if rdate_prop else [])
+            for r in rdate_list:
+                for d in r.dts:
+                    rdate = d.dt[0] if isinstance(d.dt, tuple) else d.dt
+                    if search_lo <= roh_datum(rdate) <= fenster_hi:
+                        add_instanz(to_local(rdate, tz_local))
+
+        for component in serie.masters:
+            try:
+                expandiere_master(component)
+            except GrenzeUeberschritten:
+                raise
+            except Exception as e:
+                summary_str = html.escape(str(component.get("summary") or "Ohne Titel"))
+                print(f"Fehler beim Verarbeiten eines Termins ('{summary_str}'): {e}", file=sys.stderr)
+
+        for _, override_component in serie.overrides.values():
+            if id(override_component) in aufgeloest or not override_component.get("dtstart"):
+                continue
+            # Verschobene Termine außerhalb des Fensters ohne Umrechnung verwerfen
+            try:
+                erster_tag, letzter_tag = roh_spanne(override_component)
+            except Exception:
+                erster_tag = letzter_tag = fenster_lo  # Fehlermeldung kommt aus add_override
+            if erster_tag <= fenster_hi and letzter_tag >= fenster_lo:
+                add_override(override_component)
+
+        dauer = perf_counter() - t0
+        METRIKEN.zaehle("serien_expandiert")
+        METRIKEN.zaehle("vorkommen", vorkommen)
+        METRIKEN.addiere("rrule", rrule_zeit)
+        METRIKEN.addiere("expansion", dauer)
+        if METRIKEN.serien_kosten is not None:
+            erster = serie.erste_komponente()
+            summary = str(erster.get("summary") or "Ohne Titel") if erster is not None else ""
+            rrule_prop = erster.get("rrule") if erster is not None else None
+            rrule_text = rrule_prop.to_ical().decode() if rrule_prop else ""
+            METRIKEN.serien_kosten.append((dauer, serie.uid, summary, rrule_text, vorkommen, exdates))
+
+
+def erzeuge_termine(
+    vevents: List[Any],
+    fenster_start_dt: datetime,
+    fenster_ende_dt: datetime,
+    tage_local: set[date],
+    tz_local: ZoneInfo,
+    regel_cache: RegelCache,
+    waechter: Waechter | None = None,
+) -> Dict[date, List[Vorkommen]]:
+    """
+    Expandiert alle VEVENTs in das Fenster [fenster_start_dt, fenster_ende_dt] und verteilt sie
+    auf die lokalen Kalendertage. Overrides werden pro UID direkt bei der Expansion aufgelöst.
+    Mit Wächter landen nur vollständig expandierte Serien im Ergebnis.
+    """
+    week_events: Dict[date, List[Vorkommen]] = {d: [] for d in tage_local}
+    expander = SerienExpander(fenster_start_dt, fenster_ende_dt, tage_local, tz_local, regel_cache, waechter)
+    for serie in sammle_serien(vevents, tz_local).values():
+        if waechter is None:
+            expander.expandiere(serie, week_events)
+            continue
+        if waechter.budget_erschoepft():
+            melde_uebersprungen(serie, "budget")
+            continue
+        teil: Dict[date, List[Vorkommen]] = defaultdict(list)
+        if expander.expandiere(serie, teil):
+            for tag, liste in teil.items():
+                week_events[tag].extend(liste)
+    return week_events
+
+
+# ------------------------------ Termin-Index (SQLite) ------------------------------
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (schluessel TEXT PRIMARY KEY, wert TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS serien (
+    uid TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    von INTEGER NOT NULL,
+    bis INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vorkommen (
+    uid TEXT NOT NULL,
+    tag INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    von INTEGER NOT NULL,
+    bis INTEGER NOT NULL,
+    art INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    location TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vorkommen_tag ON vorkommen (tag, start);
+CREATE INDEX IF NOT EXISTS vorkommen_uid ON vorkommen (uid);
+"""
+
+
+class TerminIndex:
+    """
+    Persistenter Index je UID: Inhalts-Hash der VEVENT-Blöcke, abgedecktes Fenster
+    (Tages-Ordinalzahlen) und die vorexpandierten Vorkommen je Tag. Geparst und expandiert
+    werden nur UIDs mit neuen/geänderten Blöcken oder nicht abgedecktem Fenster.
+    """
+
+    def __init__(self, pfad: str, tz_local: ZoneInfo) -> None:
+        os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+        self.db = sqlite3.connect(pfad)
+        self.db.executescript(_INDEX_SCHEMA)
+        self.rang: Dict[str, int] = {}  # Reihenfolge der UIDs im Feed (stabile Sortierung)
+
+        # Anderer Renderer/andere Zeitzone → Index verwerfen
+        stand = f"{INDEX_SCHEMA_VERSION}|{RENDERER_VERSION}|{tz_local.key}"
+        zeile = self.db.execute("SELECT wert FROM meta WHERE schluessel = 'stand'").fetchone()
+        if zeile is None or zeile[0] != stand:
+            with self.db:
+                self.db.execute("DELETE FROM vorkommen")
+                self.db.execute("DELETE FROM serien")
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('stand', ?)", (stand,))
+
+    def aktualisiere(
+        self,
+        feed: FeedBloecke,
+        fenster_start_dt: datetime,
+        fenster_ende_dt: datetime,
+        tz_local: ZoneInfo,
+        regel_cache: RegelCache,
+        waechter: Waechter | None = None,
+    ) -> Tuple[int, int, int]:
+        """
+        Gleicht den Index mit dem Feed ab. Rückgabe: (neu expandiert, übernommen, entfernt).
+        Serien über einer Grenze verlieren ihre Zeilen (nächster Lauf versucht es erneut);
+        ist das Build-Budget erschöpft, bleibt der alte Stand der restlichen UIDs stehen.
+        """
+        von, bis = fenster_start_dt.date(), fenster_ende_dt.date()
+        # Lückenlos Mo–Fr über den ganzen Bereich, damit jedes Teilfenster abgedeckt ist
+        tage = {
+            von + timedelta(days=i)
+            for i in range((bis - von).days + 1)
+            if (von + timedelta(days=i)).weekday() < 5
+        }
+
+        # Blöcke je UID (Feed-Reihenfolge); Version = Hash über Kopf, VTIMEZONEs und alle Blöcke
+        gruppen: Dict[str, List[List[bytes]]] = {}
+        for block in feed.vevents:
+            gruppen.setdefault(block_uid(block), []).append(block)
+        basis = hashlib.sha1(b"\n".join(feed.kopf + feed.zeitzonen))
+        versionen: Dict[str, str] = {}
+        for uid, bloecke in gruppen.items():
+            h = basis.copy()
+            for block in bloecke:
+                h.update(b"\0" + b"\n".join(block))
+            versionen[uid] = h.hexdigest()
+
+        gespeichert = {
+            uid: (version, v, b)
+            for uid, version, v, b in self.db.execute("SELECT uid, version, von, bis FROM serien")
+        }
+        geaendert = [
+            uid for uid, version in versionen.items()
+            if not (
+                uid in gespeichert and gespeichert[uid][0] == version
+                and gespeichert[uid][1] <= von.toordinal() and gespeichert[uid][2] >= bis.toordinal()
+            )
+        ]
+
+        # Nur neue/geänderte Blöcke parsen; walk() liefert die VEVENTs in Block-Reihenfolge
+        komponenten = parse_bloecke(feed, (block for uid in geaendert for block in gruppen[uid])) if geaendert else []
+        if len(komponenten) != sum(len(gruppen[uid]) for uid in geaendert):
+            raise ValueError("Anzahl geparster VEVENTs passt nicht zu den Rohblöcken")
+
+        expander = SerienExpander(fenster_start_dt, fenster_ende_dt, tage, tz_local, regel_cache, waechter)
+        entfernt = gespeichert.keys() - gruppen.keys()
+        self.rang = {uid: rang for rang, uid in enumerate(gruppen)}
+        with self.db:
+            self.db.executemany("DELETE FROM vorkommen WHERE uid = ?", ((uid,) for uid in entfernt))
+            self.db.executemany("DELETE FROM serien WHERE uid = ?", ((uid,) for uid in entfernt))
+            pos_komponente = 0
+            for uid in geaendert:
+                anzahl = len(gruppen[uid])
+                teil = komponenten[pos_komponente:pos_komponente + anzahl]
+                pos_komponente += anzahl
+
+                serien = sammle_serien(teil, tz_local).values()
+                if waechter is not None and waechter.budget_erschoepft():
+                    for serie in serien:
+                        melde_uebersprungen(serie, "budget")
+                    continue
+                week_events: Dict[date, List[Vorkommen]] = defaultdict(list)
+                vollstaendig = all([expander.expandiere(serie, week_events) for serie in serien])
+                if uid in gespeichert:
+                    self.db.execute("DELETE FROM vorkommen WHERE uid = ?", (uid,))
+                if not vollstaendig:
+                    self.db.execute("DELETE FROM serien WHERE uid = ?", (uid,))
+                    continue
+                self.db.executemany(
+                    "INSERT INTO vorkommen VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (uid, tag.toordinal(), pos, v.start, v.von, v.bis, v.art, v.summary, v.location)
+                        for tag, liste in week_events.items()
+                        for pos, v in enumerate(liste)
+                    ),
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO serien VALUES (?, ?, ?, ?)",
+                    (uid, versionen[uid], von.toordinal(), bis.toordinal()),
+                )
+        return len(geaendert), len(gruppen) - len(geaendert), len(entfernt)
+
+    def vorkommen(self, tage_local: set[date]) -> Dict[date, List[Vorkommen]]:
+        """Bereichsabfrage über (tag, start); Reihenfolge je Tag wie bei der direkten Expansion."""
+        week_events: Dict[date, List[Vorkommen]] = {d: [] for d in tage_local}
+        zeilen = self.db.execute(
+            "SELECT uid, pos, tag, start, von, bis, art, summary, location FROM vorkommen WHERE tag BETWEEN ? AND ?",
+            (min(tage_local).toordinal(), max(tage_local).toordinal()),
+        ).fetchall()
+        zeilen.sort(key=lambda z: (self.rang.get(z[0], 0), z[1]))
+        for _, _, tag, start, von, bis, art, summary, location in zeilen:
+            liste = week_events.get(date.fromordinal(tag))
+            if liste is not None:
+                liste.append(Vorkommen(start, von, bis, art, sys.intern(summary), sys.intern(location)))
+        return week_events
+
+    def schliessen(self) -> None:
+        self.db.close()
+
+
 # ------------------------------------ HTML rendern -------------------------------------
 
 def render_html(
-    week_events: Dict[date, List[Dict[str, Any]]],
+    week_events: Dict[date, List[Vorkommen]],
     monday_local: date,
     friday_local: date,
     now_local_dt: datetime,
+    veraltet_seit: datetime | None = None,
 ) -> str:
-    calendar_week = now_local_dt.isocalendar()[1]
+    calendar_week = monday_local.isocalendar()[1]
     tz_local = now_local_dt.tzinfo  # type: ignore
     timestamp_local = datetime.now(tz_local).strftime("%d.%m.%Y um %H:%M:%S Uhr")
+    fusszeile = f"Kalender zuletzt aktualisiert am {timestamp_local}"
+    if veraltet_seit is not None:
+        stand = veraltet_seit.astimezone(tz_local).strftime("%d.%m.%Y um %H:%M Uhr")
+        fusszeile += f" · Quelle nicht erreichbar, Daten vom {stand}"
 
     def fmt_short(d: date) -> str:
         return d.strftime("%d.%m.")
@@ -329,7 +2367,7 @@ footer.foot {{
         current_date = monday_local + timedelta(days=i)
         events = week_events.get(current_date, [])
         # Ganztägig zuerst, dann Startzeit, dann Titel
-        events.sort(key=lambda x: (not x["is_all_day"], x["start_time"], x["summary"].lower()))
+        events.sort(key=lambda x: (not x.is_all_day, x.start, x.summary.lower()))
         is_today_cls = " today" if current_date == today_local_date else ""
 
         parts.append(
@@ -348,13 +2386,13 @@ footer.foot {{
         else:
             for ev in events:
                 loc_html = ""
-                if ev.get("location"):
-                    loc_html = f'<div class="meta">{html.escape(ev["location"])}</div>'
-                body_html = f'<div class="summary">{ev["summary"]}</div>{loc_html}'
+                if ev.location:
+                    loc_html = f'<div class="meta">{html.escape(ev.location)}</div>'
+                body_html = f'<div class="summary">{ev.summary}</div>{loc_html}'
                 parts.append(
                     "".join(
                         [
-                            f'<article class="event"><h3 class="event-time">{ev["time"]}</h3>',
+                            f'<article class="event"><h3 class="event-time">{ev.zeit_text()}</h3>',
                             f'<div class="event-body">{body_html}</div></article>',
                         ]
                     )
@@ -363,232 +2401,594 @@ footer.foot {{
         parts.append("</div></article>")
 
     parts.append(
-        f'</section></main><footer class="foot" role="contentinfo">Kalender zuletzt aktualisiert am {timestamp_local}</footer></body></html>'
+        f'</section></main><footer class="foot" role="contentinfo">{fusszeile}</footer></body></html>'
     )
     return "".join(parts)
 
 
-# ------------------------------------ Hauptlogik -------------------------------------
+# ------------------------------------ Wochenbereich -------------------------------------
+
+def wochen_fuer_lauf(monday_local: date) -> List[date]:
+    """Montage aller zu rendernden Wochen: aktuelle + folgende, optional ein ganzes Archiv-Jahr."""
+    starts = {monday_local + timedelta(weeks=i) for i in range(WOCHEN_ANZAHL)}
+    if ARCHIV_JAHR:
+        anzahl_kw = date(ARCHIV_JAHR, 12, 28).isocalendar()[1]
+        starts.update(date.fromisocalendar(ARCHIV_JAHR, kw, 1) for kw in range(1, anzahl_kw + 1))
+    return sorted(starts)
+
+
+def wochen_pfad(monday_local: date) -> str:
+    jahr, kw, _ = monday_local.isocalendar()
+    return os.path.join(WOCHEN_DIR, f"{jahr}-W{kw:02d}", "index.html")
+
+
+# ------------------------------------ HTTP-Server (Daemon) -------------------------------------
+
+class Seite(NamedTuple):
+    etag: str                    # starker ETag aus dem Inhalts-Hash (ohne Anführungszeichen)
+    varianten: Dict[str, bytes]  # Content-Encoding → Body ("identity", "gzip", ggf. "br")
+
+
+class SeitenSpeicher:
+    """Zuletzt gerenderte Seiten im Speicher, vorkomprimiert; Schlüssel = Pfad relativ zu public/."""
+
+    def __init__(self) -> None:
+        self._seiten: Dict[str, Seite] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def url_pfad(datei_pfad: str) -> str:
+        return os.path.relpath(datei_pfad, PUBLIC_DIR).replace(os.sep, "/")
+
+    def setze(self, datei_pfad: str, daten: bytes) -> None:
+        varianten = {"identity": daten, "gzip": gzip.compress(daten, 9, mtime=0)}
+        if brotli is not None:
+            varianten["br"] = brotli.compress(daten, quality=11)
+        seite = Seite(hashlib.sha256(daten).hexdigest()[:32], varianten)
+        with self._lock:
+            self._seiten[self.url_pfad(datei_pfad)] = seite
+
+    def hole(self, url_pfad: str) -> Seite | None:
+        with self._lock:
+            return self._seiten.get(url_pfad)
+
+    def lade_von_platte(self) -> None:
+        """Vorhandene Seiten übernehmen, damit der Server schon vor dem ersten Rendern antwortet."""
+        pfade = [OUTPUT_HTML_FILE]
+        if os.path.isdir(WOCHEN_DIR):
+            pfade += [os.path.join(WOCHEN_DIR, d, "index.html") for d in os.listdir(WOCHEN_DIR)]
+        for pfad in pfade:
+            try:
+                with open(pfad, "rb") as f:
+                    self.setze(pfad, f.read())
+            except OSError:
+                pass
+
+
+def waehle_encoding(accept_encoding: str, varianten: Dict[str, bytes]) -> str:
+    """Bevorzugt br vor gzip; q=0 schließt eine Kodierung aus."""
+    akzeptiert: Dict[str, float] = {}
+    for teil in accept_encoding.split(","):
+        name, _, params = teil.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        akzeptiert[name.strip().lower()] = q
+    for kodierung in ("br", "gzip"):
+        if kodierung in varianten and akzeptiert.get(kodierung, akzeptiert.get("*", 0.0)) > 0:
+            return kodierung
+    return "identity"
+
+
+class KalenderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-Alive
+    seiten: SeitenSpeicher
+
+    def do_HEAD(self) -> None:
+        self.do_GET(body=False)
+
+    def do_GET(self, body: bool = True) -> None:
+        pfad = self.path.split("?", 1)[0].lstrip("/")
+        if pfad == "":
+            pfad = self.seiten.url_pfad(OUTPUT_HTML_FILE)
+        elif pfad.endswith("/"):
+            pfad += "index.html"
+        seite = self.seiten.hole(pfad)
+        if seite is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
 
-def erstelle_kalender_html() -> None:
-    ics_url = os.getenv("ICS_URL")
-    if not ics_url:
-        print("Fehler: Die Environment-Variable 'ICS_URL' ist nicht gesetzt!", file=sys.stderr)
-        sys.exit(1)
+        kodierung = waehle_encoding(self.headers.get("Accept-Encoding", ""), seite.varianten)
+        etag = f'"{seite.etag}"' if kodierung == "identity" else f'"{seite.etag}-{kodierung}"'
+        angefragt = [t.strip().removeprefix("W/") for t in self.headers.get("If-None-Match", "").split(",")]
+        daten = seite.varianten[kodierung]
+        nicht_geaendert = etag in angefragt or "*" in angefragt
+
+        self.send_response(304 if nicht_geaendert else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if nicht_geaendert:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if kodierung != "identity":
+            self.send_header("Content-Encoding", kodierung)
+        self.send_header("Content-Length", str(len(daten)))
+        self.end_headers()
+        if body:
+            self.wfile.write(daten)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # 50 Bildschirme × 1/min: kein Zugriffslog
+
+
+def starte_http_server(seiten: SeitenSpeicher) -> ThreadingHTTPServer:
+    handler = type("Handler", (KalenderHandler,), {"seiten": seiten})
+    server = ThreadingHTTPServer((HTTP_HOST, HTTP_PORT), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="kalender-http", daemon=True).start()
+    print(f"HTTP-Server lauscht auf {HTTP_HOST or '*'}:{HTTP_PORT}.")
+    return server
+
+
+# ------------------------------------ Profil-Modus -------------------------------------
+
+def schreibe_serien_bericht(pfad: str) -> List[str]:
+    """Teuerste Serien nach Expansionszeit; Rückgabe: Berichtszeilen (auch als JSON abgelegt)."""
+    kosten = sorted(METRIKEN.serien_kosten or [], reverse=True)
+    zeilen = [f"{len(kosten)} Serien expandiert, {sum(k[0] for k in kosten) * 1000:.1f} ms gesamt"]
+    uebernommen = METRIKEN.zaehler.get("index_uebernommen", 0)
+    if uebernommen:
+        zeilen.append(f"{uebernommen} UIDs aus dem Index übernommen (nicht gemessen; KALENDER_INDEX=0 misst alle)")
+    for dauer, uid, summary, rrule_text, vorkommen, exdates in kosten[:PROFIL_TOP]:
+        zeilen.append(
+            f"{dauer * 1000:9.2f} ms  {vorkommen:6d} Vorkommen  {exdates:6d} EXDATE  "
+            f"{rrule_text or '-':<40}  {uid or '(ohne UID)'}  '{summary}'"
+        )
+    schreibe_atomar(f"{pfad}.txt", ("\n".join(zeilen) + "\n").encode("utf-8"))
+    speichere_json(f"{pfad}.json", {"serien": [
+        {"sekunden": round(d, 6), "uid": u, "summary": s, "rrule": r, "vorkommen": v, "exdates": e}
+        for d, u, s, r, v, e in kosten[:PROFIL_TOP]
+    ]})
+    return zeilen
 
-    print("Lade Kalender von der bereitgestellten URL...")
 
+def profiliere(funktion: Callable[[], None]) -> None:
+    """
+    Führt einen Lauf unter cProfile und tracemalloc aus und schreibt nach PROFIL_DIR:
+    kalender.pstats (+ Textauszug), speicher.txt (Top-Allokationen) und serien.txt/.json.
+    """
+    os.makedirs(PROFIL_DIR, exist_ok=True)
+    profil = cProfile.Profile()
+    tracemalloc.start(10)
     try:
-        # WICHTIG: Bytes, nicht .text
-        response = requests.get(ics_url, timeout=30)
-        response.raise_for_status()
-        cal = Calendar.from_ical(response.content)
-    except Exception as e:
-        print(f"Fehler beim Herunterladen/Parsen der ICS-Datei: {e}", file=sys.stderr)
-        sys.exit(2)
+        profil.runcall(funktion)
+    finally:
+        schnappschuss = tracemalloc.take_snapshot()
+        aktuell, spitze = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
 
-    tz_vienna = ZoneInfo("Europe/Vienna")
-    now_local = datetime.now(tz_vienna)
+        profil.dump_stats(os.path.join(PROFIL_DIR, "kalender.pstats"))
+        auszug = io.StringIO()
+        pstats.Stats(profil, stream=auszug).sort_stats("cumulative").print_stats(40)
+        schreibe_atomar(os.path.join(PROFIL_DIR, "kalender-profil.txt"), auszug.getvalue().encode("utf-8"))
 
-    # Woche in lokaler Zeit (Mo 00:00 – Fr 23:59:59)
-    start_of_week_local_dt = now_local.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=now_local.weekday())
-    end_of_week_local_dt = start_of_week_local_dt + timedelta(days=4, hours=23, minutes=59, seconds=59)
+        speicher = [f"Spitze {spitze / 2**20:.1f} MiB, am Ende belegt {aktuell / 2**20:.1f} MiB"]
+        speicher += [str(stat) for stat in schnappschuss.statistics("lineno")[:PROFIL_TOP]]
+        schreibe_atomar(os.path.join(PROFIL_DIR, "speicher.txt"), ("\n".join(speicher) + "\n").encode("utf-8"))
 
-    monday_local = start_of_week_local_dt.date()
-    friday_local = (start_of_week_local_dt + timedelta(days=4)).date()
+        bericht = schreibe_serien_bericht(os.path.join(PROFIL_DIR, "serien"))
+        print(f"Profil in '{PROFIL_DIR}' geschrieben. Teuerste Serien:")
+        for zeile in bericht[:6]:
+            print(f"  {zeile}")
 
-    # Zielstruktur (lokale Kalendertage)
-    week_days_local = {monday_local + timedelta(days=i) for i in range(5)}
-    week_events: Dict[date, List[Dict[str, Any]]] = {d: [] for d in week_days_local}
 
-    # De-Duping über (UID oder summary|location, Startzeit lokal)
-    dedup_keys: set[tuple[str, str]] = set()
-    cancelled_occurrences: set[tuple[str, str]] = set()
+# ------------------------------------ Hauptlogik -------------------------------------
 
-    # Overrides (RECURRENCE-ID) vorab sammeln
-    vevents = list(cal.walk("VEVENT"))
-    overrides: Dict[tuple[str, datetime], Any] = {}
-    for component in vevents:
-        rec_id_prop = component.get("recurrence-id")
-        if not rec_id_prop:
-            continue
-        uid = str(component.get("uid") or "").strip()
-        rec_local = to_local(rec_id_prop.dt, tz_vienna)
-        overrides[(uid, rec_local)] = component
+class ParseFehler(Exception):
+    """Die ICS-Daten konnten nicht zerlegt/geparst werden (Exit-Code 2)."""
 
-    def add_occurrence(component, occ_start_local: datetime, occ_end_local: datetime, summary_str: str) -> None:
-        uid = str(component.get("uid") or "").strip()
-        location_str = str(component.get("location") or "").strip()
-        dedup_id = uid or f"{summary_str}|{location_str}"
-        dedup_key = (dedup_id, occ_start_local.isoformat())
-        if dedup_key in cancelled_occurrences:
-            return
-        if dedup_key in dedup_keys:
-            return
-        dedup_keys.add(dedup_key)
-        add_event_local(
-            week_events,
-            component,
-            occ_start_local,
-            occ_end_local,
-            summary_str,
-            location_str,
-            week_days_local,
-            uid if uid else None,
+
+def aktueller_montag(now_local: datetime) -> date:
+    return now_local.date() - timedelta(days=now_local.weekday())
+
+
+def oeffne_index(tz_local: ZoneInfo) -> TerminIndex | None:
+    """Öffnet den Termin-Index; deaktiviert oder nicht nutzbar → None (Expansion im Speicher)."""
+    if not INDEX_AKTIV:
+        return None
+    try:
+        return TerminIndex(INDEX_FILE, tz_local)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warnung: Termin-Index nicht nutzbar ({e}) – expandiere im Speicher.", file=sys.stderr)
+        return None
+
+
+def baue_kalender(
+    feeds: List[IcsStand],
+    now_local: datetime,
+    fingerprint: str,
+    regel_cache: RegelCache,
+    index: TerminIndex | None,
+    seiten: SeitenSpeicher | None = None,
+    veraltet_seit: datetime | None = None,
+) -> List[date]:
+    """
+    Zerlegt/parst die Feeds (eine Ansicht über alle Quellen), expandiert alle Wochen des Laufs
+    und schreibt die Seiten samt Fingerprint. Rückgabe: Montage der gerenderten Wochen.
+    """
+    tz_local = now_local.tzinfo
+    waechter = Waechter()
+    monday_local = aktueller_montag(now_local)
+
+    # Alle Wochen werden aus einem Parse- und Expansionslauf über das Gesamtfenster gerendert
+    wochen_starts = wochen_fuer_lauf(monday_local)
+    bereich_start_dt = datetime.combine(wochen_starts[0], time.min, tzinfo=tz_local)
+    bereich_ende_dt = datetime.combine(wochen_starts[-1] + timedelta(days=4), time(23, 59, 59), tzinfo=tz_local)
+
+    try:
+        feed = None
+        if VORFILTER_AKTIV or index is not None:
+            # Beim Streaming schon während des Downloads zerlegt – sonst (oder bei anderem Fenster) jetzt
+            fenster = (bereich_start_dt.date(), bereich_ende_dt.date())
+            with METRIKEN.stufe("vorfilter"):
+                feed = vereinige_feeds([
+                    stand.bloecke if stand.bloecke is not None and stand.fenster == fenster
+                    else zerlege_feed(stand.stuecke(), *fenster, VORFILTER_AKTIV)
+                    for stand in feeds
+                ])
+    except Exception as e:
+        raise ParseFehler(e) from e
+
+    # Zielstruktur (lokale Kalendertage Mo–Fr aller Wochen)
+    tage_local = {start + timedelta(days=i) for start in wochen_starts for i in range(5)}
+
+    events_nach_tag = None
+    if feed is not None and index is not None:
+        # Nur geänderte VEVENT-Blöcke parsen/expandieren, Rendering aus einer Bereichsabfrage
+        try:
+            with METRIKEN.stufe("index"):
+                neu, uebernommen, entfernt = index.aktualisiere(
+                    feed, bereich_start_dt, bereich_ende_dt, tz_local, regel_cache, waechter
+                )
+            with METRIKEN.stufe("index_abfrage"):
+                events_nach_tag = index.vorkommen(tage_local)
+            METRIKEN.zaehle("index_neu", neu)
+            METRIKEN.zaehle("index_uebernommen", uebernommen)
+            print(f"Index: {neu} UIDs neu geparst/expandiert, {uebernommen} übernommen, {entfernt} entfernt.")
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"Warnung: Termin-Index nicht nutzbar ({e}) – expandiere im Speicher.", file=sys.stderr)
+    if events_nach_tag is None:
+        try:
+            if feed is not None:
+                vevents = parse_bloecke(feed, feed.vevents)
+            else:
+                vevents = [
+                    v for stand in feeds for v in Calendar.from_ical(b"".join(stand.stuecke())).walk("VEVENT")
+                ]
+        except Exception as e:
+            raise ParseFehler(e) from e
+        events_nach_tag = erzeuge_termine(
+            vevents, bereich_start_dt, bereich_ende_dt, tage_local, tz_local, regel_cache, waechter
+        )
+    regel_cache.speichern()
+    budget_treffer = METRIKEN.zaehler.get("uebersprungen_budget", 0)
+    if budget_treffer:
+        print(
+            f"Warnung: Build-Budget von {BUILD_BUDGET:g}s erschöpft – {budget_treffer} Serien nicht expandiert.",
+            file=sys.stderr,
         )
-        cancelled_occurrences.discard(dedup_key)
 
-    for component in vevents:
-        summary_str = ""
+    # HTML erzeugen & schreiben: aktuelle Woche als index.html, jede Woche zusätzlich unter kw/
+    for start in wochen_starts:
+        with METRIKEN.stufe("render"):
+            html_str = render_html(events_nach_tag, start, start + timedelta(days=4), now_local, veraltet_seit)
+            html_bytes = html_str.encode("utf-8")
+        pfade = [OUTPUT_HTML_FILE] if start == monday_local else []
+        if len(wochen_starts) > 1:
+            pfade.append(wochen_pfad(start))
+        with METRIKEN.stufe("schreiben"):
+            for pfad in pfade:
+                schreibe_atomar(pfad, html_bytes)
+                if seiten is not None:
+                    seiten.setze(pfad, html_bytes)
+    # Unvollständiger Build (Budget oder Grenze je Serie) → kein Fingerprint, der nächste Lauf baut
+    # erneut; ein älterer Fingerprint wird entfernt, damit er nicht zufällig wieder passt
+    if METRIKEN.uebersprungen:
         try:
-            # Titel + Ort
-            raw_summary = str(component.get("summary") or "Ohne Titel")
-            summary_str = html.escape(raw_summary)
-            location_str = str(component.get("location") or "").strip()
-            uid = str(component.get("uid") or "").strip()
-            status = str(component.get("status") or "").strip().upper()
-            rec_id_prop = component.get("recurrence-id")
-            dtstart_prop = component.get("dtstart")
-
-            if status == "CANCELLED":
-                if rec_id_prop:
-                    cancel_start_local = to_local(rec_id_prop.dt, tz_vienna)
-                elif dtstart_prop:
-                    cancel_start_local = to_local(dtstart_prop.dt, tz_vienna)
-                else:
-                    continue
+            os.remove(FINGERPRINT_FILE)
+        except FileNotFoundError:
+            pass
+    else:
+        with METRIKEN.stufe("schreiben"):
+            schreibe_atomar(FINGERPRINT_FILE, fingerprint.encode("utf-8"))
+    return wochen_starts
+
+
+def hole_ics(
+    abruf: IcsAbruf, budget: float = FETCH_BUDGET, praefix: str = "", seit: float | None = None
+) -> Tuple[IcsStand | None, datetime | None]:
+    """
+    Wartet höchstens budget Sekunden (gezählt ab seit, Standard: jetzt) auf den Abruf. Dauert er
+    länger oder schlägt er fehl, kommt der letzte Stand aus dem Cache.
+    Rückgabe: (Stand oder None, Zeitpunkt des alten Stands).
+    """
+    rest = budget if seit is None else max(0.0, seit + budget - perf_counter())
+    with METRIKEN.stufe("fetch"):
+        fertig = abruf.warte(rest)
+    if fertig:
+        if abruf.fehler is None and abruf.ergebnis is not None:
+            stand, unveraendert = abruf.ergebnis
+            if unveraendert:
+                print(f"{praefix}ICS unverändert (304) – verwende zwischengespeicherten Stand.")
+            return stand, None
+        grund = str(abruf.fehler)
+    else:
+        grund = f"Zeitbudget von {budget:g}s überschritten"
+
+    METRIKEN.zaehle("veraltet")
+    stand = lade_letzten_stand(abruf.ics_url, abruf.fenster)
+    if stand is None:
+        print(f"{praefix}Fehler beim Herunterladen/Parsen der ICS-Datei: {grund}", file=sys.stderr)
+        return None, None
+    print(
+        f"{praefix}Warnung: {grund} – rendere aus dem letzten Stand vom {stand[1]:%d.%m.%Y %H:%M} UTC.",
+        file=sys.stderr,
+    )
+    return stand
 
-                cancel_key = (
-                    uid if uid else f"{summary_str}|{location_str}",
-                    cancel_start_local.isoformat(),
-                )
-                cancelled_occurrences.add(cancel_key)
-                dedup_keys.discard(cancel_key)
-
-                for events in week_events.values():
-                    if uid:
-                        events[:] = [
-                            ev
-                            for ev in events
-                            if not (
-                                ev.get("start_time") == cancel_start_local
-                                and ev.get("uid") == uid
-                            )
-                        ]
-                    else:
-                        events[:] = [
-                            ev
-                            for ev in events
-                            if not (
-                                ev.get("start_time") == cancel_start_local
-                                and ev.get("summary") == summary_str
-                                and ev.get("location") == location_str
-                            )
-                        ]
-                continue
 
-            if rec_id_prop:
-                continue
-            if not dtstart_prop:
-                continue
+def ics_quellen() -> List[str]:
+    """
+    Quellen aus ICS_URL (mehrere durch Leerzeichen/Zeilenumbrüche getrennt, doppelte einmal).
+    Lokale Pfade werden zu file://-URLs; ein Verzeichnis steht für alle *.ics-Dateien darin.
+    """
+    quellen: List[str] = []
+    for eintrag in os.getenv("ICS_URL", "").split():
+        pfad = lokaler_pfad(eintrag)
+        if pfad is None:
+            quellen.append(eintrag)
+        elif os.path.isdir(pfad):
+            quellen += [Path(datei).absolute().as_uri() for datei in ics_dateien(pfad)]
+        else:
+            quellen.append(Path(pfad).absolute().as_uri())
+    return list(dict.fromkeys(quellen))
 
-            # Start/Ende (lokal)
-            dtstart_raw = dtstart_prop.dt
-            start_local = to_local(dtstart_raw, tz_vienna)
 
-            dtend_prop = component.get("dtend")
-            duration_prop = component.get("duration")
+def stream_fenster(now_local: datetime) -> Tuple[date, date] | None:
+    """Fenster, für das die Abrufe den Feed schon beim Download zerlegen (None = erst im Build)."""
+    if not STREAMING_AKTIV or not (VORFILTER_AKTIV or INDEX_AKTIV):
+        return None
+    wochen_starts = wochen_fuer_lauf(aktueller_montag(now_local))
+    return wochen_starts[0], wochen_starts[-1] + timedelta(days=4)
 
-            if not dtend_prop and duration_prop:
-                end_local = start_local + duration_prop.dt
-            else:
-                dtend_raw = dtend_prop.dt if dtend_prop else dtstart_raw
-                end_local = to_local(dtend_raw, tz_vienna)
 
-            # Dauer (für Suchfenster-Puffer)
-            duration = end_local - start_local
-            pad = duration if duration > timedelta(0) else timedelta(0)
+def hole_quellen(abrufe: List[IcsAbruf]) -> Tuple[List[IcsStand], datetime | None]:
+    """
+    Die Abrufe laufen parallel; gemeinsam wird höchstens FETCH_BUDGET Sekunden gewartet. Jede
+    Quelle fällt einzeln auf ihren letzten Stand zurück, Quellen ganz ohne Stand fehlen in der
+    Ansicht. Für Quellen ohne letzten Stand gilt das Budget nicht – auf sie wird bis zum
+    Connect- plus Read-Timeout gewartet, statt sofort aufzugeben.
+    Rückgabe: (Stand je verfügbarer Quelle, ältester veralteter Stand oder None).
+    """
+    start = perf_counter()
+    feeds: List[IcsStand] = []
+    veraltet: List[datetime] = []
+    for nr, abruf in enumerate(abrufe, 1):
+        praefix = f"Quelle {nr}: " if len(abrufe) > 1 else ""
+        budget = FETCH_BUDGET
+        if not abruf.lokal and not os.path.exists(fetch_cache_pfade(abruf.ics_url)[0]):
+            budget = max(FETCH_BUDGET, CONNECT_TIMEOUT + READ_TIMEOUT)
+        stand, veraltet_seit = hole_ics(abruf, budget, praefix, start)
+        if stand is None:
+            METRIKEN.zaehle("quellen_fehlend")
+            continue
+        feeds.append(stand)
+        if veraltet_seit is not None:
+            veraltet.append(veraltet_seit)
+    # Stände nicht mehr konfigurierter (z. B. gelöschter) Dateien freigeben
+    for pfad in _DATEI_STAENDE.keys() - {lokaler_pfad(abruf.ics_url) for abruf in abrufe}:
+        del _DATEI_STAENDE[pfad]
+    METRIKEN.zaehle("quellen", len(feeds))
+    return feeds, min(veraltet, default=None)
 
-            # Wiederholungen (RRULE)
-            rrule_prop = component.get("rrule")
-            if rrule_prop:
-                # EXDATE sammeln
-                exdates_local: set[datetime] = set()
-                ex_prop = component.get("exdate")
-                ex_list = ex_prop if isinstance(ex_prop, list) else ([ex_prop] if ex_prop else [])
-                for ex in ex_list:
-                    for d in ex.dts:
-                        exdates_local.add(to_local(d.dt, tz_vienna))
-
-                rule = rrulestr(rrule_prop.to_ical().decode(), dtstart=start_local)
-                # leicht nach vorne ziehen, damit Events, die am Sonntag 24h laufen, montags erscheinen
-                search_start = start_of_week_local_dt - pad
-                search_end = end_of_week_local_dt
-
-                for occ_start_local in rule.between(search_start, search_end, inc=True):
-                    occ_start_local = to_local(occ_start_local, tz_vienna)
-                    if occ_start_local in exdates_local:
-                        continue
-                    if (uid, occ_start_local) in overrides:
-                        continue
-                    add_occurrence(component, occ_start_local, occ_start_local + duration, summary_str)
+
+def lasse_abrufe_auslaufen(abrufe: List[IcsAbruf]) -> None:
+    """
+    Einzellauf: Abrufe, die das Zeitbudget überschritten haben, noch zu Ende laufen lassen, damit sie
+    den Fetch-Cache schreiben. Sonst käme ein Upstream, der immer länger als das Budget braucht, nie
+    über den alten Stand hinaus. Begrenzt durch Timeouts, Wiederholungen und Backoff des Abrufs.
+    """
+    offen = [abruf for abruf in abrufe if not abruf.fertig.is_set()]
+    if not offen:
+        return
+    print(f"Warte auf {len(offen)} laufende(n) Abruf(e), um den ICS-Cache zu aktualisieren...")
+    frist = perf_counter() + (HTTP_RETRIES + 1) * (CONNECT_TIMEOUT + READ_TIMEOUT) + HTTP_RETRIES * HTTP_BACKOFF_MAX
+    with METRIKEN.stufe("nachlauf"):
+        for abruf in offen:
+            if not abruf.warte(max(0.0, frist - perf_counter())):
+                print("Warnung: Abruf auch im Nachlauf nicht fertig – Cache bleibt auf dem alten Stand.", file=sys.stderr)
+            elif abruf.fehler is not None:
+                print(f"Warnung: Abruf im Nachlauf fehlgeschlagen: {abruf.fehler}", file=sys.stderr)
             else:
-                # Einzeltermin
-                add_occurrence(component, start_local, end_local, summary_str)
+                METRIKEN.zaehle("nachlauf_aktualisiert")
+                print("ICS-Cache aktualisiert – der nächste Lauf rendert den neuen Stand.")
 
-            # Zusätzliche Einzeltermine (RDATE)
-            rdate_prop = component.get("rdate")
-            rdate_list = rdate_prop if isinstance(rdate_prop, list) else ([rdate_prop] if rdate_prop else [])
-            for r in rdate_list:
-                for d in r.dts:
-                    r_local = to_local(d.dt, tz_vienna)
-                    if (uid, r_local) in overrides:
-                        continue
-                    add_occurrence(component, r_local, r_local + duration, summary_str)
 
-        except Exception as e:
-            print(f"Fehler beim Verarbeiten eines Termins ('{summary_str}'): {e}", file=sys.stderr)
+def jetzt(tz_local: ZoneInfo) -> datetime:
+    """Aktuelle Zeit; KALENDER_JETZT (ISO-8601) legt sie fest (Benchmarks, reproduzierbare Läufe)."""
+    if not JETZT_FEST:
+        return datetime.now(tz_local)
+    fest = datetime.fromisoformat(JETZT_FEST)
+    return fest.replace(tzinfo=tz_local) if fest.tzinfo is None else fest.astimezone(tz_local)
 
-    for override_component in overrides.values():
-        summary_str = ""
+
+def pruefe_quellen() -> List[str]:
+    """ics_quellen() für den Start: ohne ICS_URL Exit 1, ohne eine einzige Quelle (leeres Verzeichnis) Exit 2."""
+    if not os.getenv("ICS_URL", "").split():
+        print("Fehler: Die Environment-Variable 'ICS_URL' ist nicht gesetzt!", file=sys.stderr)
+        sys.exit(1)
+    quellen = ics_quellen()
+    if not quellen:
+        print("Fehler: ICS_URL enthält keine ICS-Quelle (Verzeichnis ohne *.ics-Dateien?)", file=sys.stderr)
+        sys.exit(2)
+    return quellen
+
+
+def erstelle_kalender_html() -> None:
+    quellen = pruefe_quellen()
+
+    tz_vienna = ZoneInfo("Europe/Vienna")
+    now_local = jetzt(tz_vienna)
+
+    print("Lade Kalender von der bereitgestellten URL..." if len(quellen) == 1 else f"Lade Kalender von {len(quellen)} Quellen...")
+
+    fenster = stream_fenster(now_local)
+    abrufe = [IcsAbruf(url, fenster=fenster) for url in quellen]
+    try:
+        feeds, veraltet_seit = hole_quellen(abrufe)
+        if not feeds:
+            sys.exit(2)
+
+        fingerprint = build_fingerprint(
+            feeds, wochen_fuer_lauf(aktueller_montag(now_local)), now_local.date(), veraltet_seit is not None
+        )
+        if fingerprint_unveraendert(fingerprint):
+            print(f"Keine Änderung – '{OUTPUT_HTML_FILE}' ist aktuell (Fingerprint identisch).")
+            sys.exit(EXIT_UNVERAENDERT)
+
+        # Regel-Cache (Serienende, Checkpoints) und Termin-Index vom letzten Lauf
+        regel_cache = RegelCache(REGEL_CACHE_FILE)
+        index = oeffne_index(tz_vienna)
         try:
-            status = str(override_component.get("status") or "").strip().upper()
-            if status == "CANCELLED":
-                continue
+            wochen_starts = baue_kalender(feeds, now_local, fingerprint, regel_cache, index, None, veraltet_seit)
+        except ParseFehler as e:
+            print(f"Fehler beim Herunterladen/Parsen der ICS-Datei: {e}", file=sys.stderr)
+            sys.exit(2)
+        finally:
+            if index is not None:
+                index.schliessen()
 
-            raw_summary = str(override_component.get("summary") or "Ohne Titel")
-            summary_str = html.escape(raw_summary)
+        if len(wochen_starts) > 1:
+            print(f"{len(wochen_starts)} Wochenseiten unter '{WOCHEN_DIR}' erstellt.")
+        print(f"Fertig! Wochenkalender wurde erfolgreich in '{OUTPUT_HTML_FILE}' erstellt.")
+    finally:
+        lasse_abrufe_auslaufen(abrufe)
 
-            dtstart_prop = override_component.get("dtstart")
-            if not dtstart_prop:
-                continue
 
-            occ_start_local = to_local(dtstart_prop.dt, tz_vienna)
+# ------------------------------------ Daemon-Modus -------------------------------------
 
-            dtend_prop = override_component.get("dtend")
-            duration_prop = override_component.get("duration")
+def schreibe_health(status: str, **felder: Any) -> None:
+    speichere_json(HEALTH_FILE, {"status": status, "pid": os.getpid(), "intervall": DAEMON_INTERVALL, **felder})
 
-            if not dtend_prop and duration_prop:
-                occ_end_local = occ_start_local + duration_prop.dt
-            else:
-                dtend_raw = dtend_prop.dt if dtend_prop else dtstart_prop.dt
-                occ_end_local = to_local(dtend_raw, tz_vienna)
 
-            add_occurrence(override_component, occ_start_local, occ_end_local, summary_str)
-        except Exception as e:
-            print(
-                f"Fehler beim Verarbeiten eines Override-Termins ('{summary_str}'): {e}",
-                file=sys.stderr,
-            )
+def kalender_daemon() -> None:
+    """
+    Dauerbetrieb: hält Regel-Cache und Termin-Index offen, pollt die ICS-Quellen per Conditional GET
+    und rendert nur neu, wenn sich Feed, Woche oder der heutige Tag geändert haben (Fingerprint).
+    SIGTERM/SIGINT beenden nach dem laufenden Durchgang; Zustand steht in HEALTH_FILE.
+    """
+    pruefe_quellen()
 
-    # HTML erzeugen & schreiben
-    html_str = render_html(week_events, monday_local, friday_local, now_local)
-    os.makedirs(os.path.dirname(OUTPUT_HTML_FILE), exist_ok=True)
-    with open(OUTPUT_HTML_FILE, "w", encoding="utf-8") as f:
-        f.write(html_str)
+    tz_vienna = ZoneInfo("Europe/Vienna")
+    stopp = threading.Event()
+    wecker = threading.Event()  # Signal oder abgeschlossener Hintergrund-Abruf
+
+    def beenden(signum: int, _frame: Any) -> None:
+        print(f"Signal {signum} empfangen – beende Daemon...")
+        stopp.set()
+        wecker.set()
+
+    signal.signal(signal.SIGTERM, beenden)
+    signal.signal(signal.SIGINT, beenden)
+
+    regel_cache = RegelCache(REGEL_CACHE_FILE)
+    index = oeffne_index(tz_vienna)
+    seiten: SeitenSpeicher | None = None
+    server: ThreadingHTTPServer | None = None
+    if HTTP_PORT:
+        seiten = SeitenSpeicher()
+        seiten.lade_von_platte()
+        server = starte_http_server(seiten)
+    zuletzt_gerendert = ""
+    laufend: Dict[str, IcsAbruf] = {}
+    print(f"Daemon gestartet (Intervall {DAEMON_INTERVALL}s, Health: '{HEALTH_FILE}').")
+    try:
+        while not stopp.is_set():
+            wecker.clear()
+            METRIKEN.zuruecksetzen()
+            now_local = datetime.now(tz_vienna)
+            fehler = ""
+            veraltet_seit = None
+            exit_code = EXIT_UNVERAENDERT
+            try:
+                # Ein noch laufender (langsamer) Abruf wird nicht doppelt gestartet; sobald er
+                # fertig ist, weckt er die Schleife und der frische Stand wird gerendert.
+                # Verzeichnisse werden je Durchgang neu gelistet (neue/gelöschte Dateien)
+                fenster = stream_fenster(now_local)
+                abrufe = [laufend.get(url) or IcsAbruf(url, wecker, fenster) for url in ics_quellen()]
+                feeds, veraltet_seit = hole_quellen(abrufe)
+                # Nur Abrufe, die erst nach dem Zeitbudget fertig werden, sollen die Schleife wecken
+                wecker.clear()
+                laufend = {a.ics_url: a for a in abrufe if not a.fertig.is_set()}
+                if not feeds:
+                    raise ParseFehler("kein ICS-Stand verfügbar")
+                fingerprint = build_fingerprint(
+                    feeds, wochen_fuer_lauf(aktueller_montag(now_local)), now_local.date(),
+                    veraltet_seit is not None,
+                )
+                if not fingerprint_unveraendert(fingerprint):
+                    baue_kalender(feeds, now_local, fingerprint, regel_cache, index, seiten, veraltet_seit)
+                    zuletzt_gerendert = now_local.isoformat()
+                    exit_code = 0
+                    print(f"{now_local:%Y-%m-%d %H:%M:%S}: '{OUTPUT_HTML_FILE}' neu erstellt.")
+            except Exception as e:
+                # Letzter Stand bleibt stehen; nächster Versuch im nächsten Intervall
+                fehler = str(e)
+                exit_code = 2
+                print(f"Fehler im Daemon-Durchgang: {e}", file=sys.stderr)
+            METRIKEN.schreiben(exit_code)
+            schreibe_health(
+                "fehler" if fehler else ("veraltet" if veraltet_seit else "ok"),
+                zuletzt_geprueft=now_local.isoformat(),
+                zuletzt_gerendert=zuletzt_gerendert,
+                veraltet_seit=veraltet_seit.isoformat() if veraltet_seit else "",
+                fehler=fehler,
+            )
 
-    print(f"Fertig! Wochenkalender wurde erfolgreich in '{OUTPUT_HTML_FILE}' erstellt.")
+            # Spätestens kurz nach Mitternacht aufwachen (Markierung „heute“, Wochenwechsel)
+            mitternacht = datetime.combine(now_local.date() + timedelta(days=1), time.min, tzinfo=tz_vienna)
+            bis_mitternacht = (mitternacht - datetime.now(tz_vienna)).total_seconds() + 1
+            if not stopp.is_set():
+                wecker.wait(max(1.0, min(DAEMON_INTERVALL, bis_mitternacht)))
+    finally:
+        if server is not None:
+            server.shutdown()
+        if index is not None:
+            index.schliessen()
+        regel_cache.speichern()
+        schreibe_health("beendet", zuletzt_gerendert=zuletzt_gerendert)
+    print("Daemon beendet.")
 
 
 if __name__ == "__main__":
-    erstelle_kalender_html()
+    if "--daemon" in sys.argv[1:]:
+        kalender_daemon()
+    else:
+        exit_code = 0
+        try:
+            if PROFIL_DIR:
+                profiliere(erstelle_kalender_html)
+            else:
+                erstelle_kalender_html()
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+            raise
+        finally:
+            METRIKEN.schreiben(exit_code)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Äquivalenz-Prüfung des leichten Parsers (KALENDER_PARSER=leicht) gegen icalendar.
+
+- Feeds: die synthetischen Benchmark-Feeds, ein Randfall-Feed (Faltung, Escapes, Parameter in
+  Anführungszeichen, VALUE=DATE/PERIOD, eigene und IANA-Zeitzonen, VALARM, kaputte Werte)
+  sowie beliebige ICS-Dateien als Argumente
+- Je VEVENT werden alle Properties verglichen, die erstelle_kalender.py liest, danach die
+  expandierten Vorkommen im Fenster um KALENDER_JETZT
+- Zusätzlich die Zeiten beider Backends (Parse sowie Parse + Expansion)
+
+Aufruf:
+  python .github/workflows/vergleiche_parser.py
+  python .github/workflows/vergleiche_parser.py export.ics --nur zeitzonen
+Exit-Codes: 0 = gleichwertig, 1 = Abweichungen gefunden
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import random
+import argparse
+import tempfile
+import importlib.util
+from datetime import date, datetime, timedelta, time
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+from zoneinfo import ZoneInfo
+
+from icalendar.prop import vRecur
+
+VERZEICHNIS = os.path.dirname(os.path.abspath(__file__))
+
+# Von erstelle_kalender.py gelesene Properties
+PROPERTIES = (
+    "uid", "summary", "location", "status", "sequence", "dtstart", "dtend", "duration",
+    "recurrence-id", "rrule", "rdate", "exdate",
+)
+
+# Wochen ab dem Montag von KALENDER_JETZT für den Vergleich der Vorkommen
+WOCHEN = 3
+
+
+def lade_modul(name: str, datei: str) -> Any:
+    spec = importlib.util.spec_from_file_location(name, os.path.join(VERZEICHNIS, datei))
+    modul = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modul)
+    return modul
+
+
+def feed_randfaelle() -> bytes:
+    """Kleiner Feed mit den Sonderfällen der Inhaltszeilen-Syntax."""
+    zeilen = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//vergleich//randfaelle//DE",
+        "BEGIN:VTIMEZONE",
+        "TZID:Eigene Zone",
+        "BEGIN:STANDARD",
+        "DTSTART:19701025T030000",
+        "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+        "TZOFFSETFROM:+0200",
+        "TZOFFSETTO:+0100",
+        "END:STANDARD",
+        "BEGIN:DAYLIGHT",
+        "DTSTART:19700329T020000",
+        "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+        "TZOFFSETFROM:+0100",
+        "TZOFFSETTO:+0200",
+        "END:DAYLIGHT",
+        "END:VTIMEZONE",
+        # Faltung mitten im Wort, Escapes, Parameter mit ':' und ';' in Anführungszeichen
+        "BEGIN:VEVENT",
+        "UID:rand-1@vergleich",
+        "SUMMARY;LANGUAGE=de:Planung\\, Budget\\; Q4 \\\\ Rückblick\\nZweite Zei",
+        " le",
+        'LOCATION;ALTREP="http://raum.example/a;b:c":Raum 3\\, 2. OG',
+        "DTSTART;TZID=Eigene Zone:20261014T090000",
+        "DTEND;TZID=Eigene Zone:20261014T103000",
+        "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20261231T235959Z",
+        "EXDATE;TZID=Eigene Zone:20261019T090000,20261021T090000",
+        "EXDATE;TZID=Eigene Zone:20261026T090000",
+        "SEQUENCE:2",
+        "BEGIN:VALARM",
+        "ACTION:DISPLAY",
+        "DESCRIPTION:Erinnerung",
+        "TRIGGER:-PT15M",
+        "END:VALARM",
+        "END:VEVENT",
+        # Override mit RECURRENCE-ID (IANA-Zone) und Absage
+        "BEGIN:VEVENT",
+        "UID:rand-1@vergleich",
+        "RECURRENCE-ID;TZID=Europe/Vienna:20261028T090000",
+        "DTSTART;TZID=Europe/Vienna:20261028T140000",
+        "DTEND;TZID=Europe/Vienna:20261028T150000",
+        "SUMMARY:Planung (verschoben)",
+        "SEQUENCE:3",
+        "END:VEVENT",
+        "BEGIN:VEVENT",
+        "UID:rand-1@vergleich",
+        "RECURRENCE-ID;TZID=Eigene Zone:20261102T090000",
+        "STATUS:CANCELLED",
+        "DTSTART;TZID=Eigene Zone:20261102T090000",
+        "END:VEVENT",
+        # Ganztag, DURATION in Wochen, RDATE als Datum, leeres RDATE
+        "BEGIN:VEVENT",
+        "UID:rand-2@vergleich",
+        "SUMMARY:Klausur",
+        "DTSTART;VALUE=DATE:20261015",
+        "DURATION:P1W",
+        "RDATE;VALUE=DATE:20261105,20261112",
+        "RDATE:",
+        "END:VEVENT",
+        # UTC, fließende Zeit, negative Dauer, kleingeschriebene Namen
+        "BEGIN:VEVENT",
+        "uid:rand-3@vergleich",
+        "summary:kleingeschrieben",
+        "DTSTART:20261016T120000Z",
+        "DURATION:-PT30M",
+        "END:VEVENT",
+        "BEGIN:VEVENT",
+        "UID:rand-4@vergleich",
+        "SUMMARY:Fließend",
+        "DTSTART:20261016T080000",
+        "DTEND:20261016T090000",
+        "X-MICROSOFT-CDO-BUSYSTATUS:BUSY",
+        "END:VEVENT",
+        # RDATE als PERIOD (Beginn/Dauer und Beginn/Ende): das Vorkommen beginnt am Periodenbeginn
+        "BEGIN:VEVENT",
+        "UID:rand-6@vergleich",
+        "SUMMARY:Periode",
+        "DTSTART:20261020T080000Z",
+        "RDATE;VALUE=PERIOD:20261021T080000Z/PT2H,20261022T100000Z/20261022T113000Z",
+        "END:VEVENT",
+        # Kaputte Werte: beide Backends verwerfen den Termin mit einer Fehlermeldung
+        "BEGIN:VEVENT",
+        "UID:rand-5@vergleich",
+        "SUMMARY:Kaputt",
+        "DTSTART:2026-10-16",
+        "SEQUENCE:x",
+        "END:VEVENT",
+        "END:VCALENDAR",
+        "",
+    ]
+    return "\r\n".join(zeilen).encode("utf-8")
+
+
+def normiere(prop: str, wert: Any) -> Any:
+    """Vergleichbare Form eines Property-Werts (beide Backends)."""
+    if wert is None or type(wert).__name__ == "vBroken":
+        return None
+    if isinstance(wert, list):
+        return [normiere(prop, w) for w in wert]
+    if isinstance(wert, str):
+        return str(wert)
+    if isinstance(wert, int):
+        return int(wert)
+    if prop in ("rdate", "exdate"):
+        return [normiere_dt(d.dt) for d in wert.dts]
+    if getattr(wert, "dt", None) is not None:
+        return normiere_dt(wert.dt)
+    if hasattr(wert, "to_ical"):  # RRULE: über icalendar kanonisiert
+        return vRecur.from_ical(wert.to_ical().decode()).to_ical().decode()
+    return repr(wert)
+
+
+def normiere_dt(dt: Any) -> Any:
+    if isinstance(dt, tuple):
+        return tuple(normiere_dt(d) for d in dt)
+    if isinstance(dt, datetime):
+        return dt.isoformat(), dt.utcoffset()
+    if isinstance(dt, (date, timedelta)):
+        return str(dt)
+    return repr(dt)
+
+
+def vorkommen(modul: Any, komponenten: List[Any]) -> List[Tuple]:
+    """Expandierte Vorkommen (alle Felder) im Vergleichsfenster."""
+    tz = ZoneInfo("Europe/Vienna")
+    montag = modul.aktueller_montag(modul.jetzt(tz))
+    tage = {montag + timedelta(days=7 * w + i) for w in range(WOCHEN) for i in range(5)}
+    start_dt = datetime.combine(min(tage), time.min, tzinfo=tz)
+    ende_dt = datetime.combine(max(tage), time(23, 59, 59), tzinfo=tz)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = modul.RegelCache(os.path.join(tmp, "regeln.json"))
+        nach_tag = modul.erzeuge_termine(komponenten, start_dt, ende_dt, tage, tz, cache)
+    return sorted(
+        (tag, v.start, v.von, v.bis, v.art, v.summary, v.location)
+        for tag, liste in nach_tag.items() for v in liste
+    )
+
+
+def vergleiche_feed(modul: Any, name: str, ics: bytes) -> List[str]:
+    """Vergleicht beide Backends auf einem Feed; Rückgabe: Liste der Abweichungen."""
+    feed = modul.zerlege_feed(ics, date.min, date.max, False)
+    parse: Dict[bool, float] = {}
+    gesamt: Dict[bool, float] = {}
+    komponenten: Dict[bool, List[Any]] = {}
+    termine: Dict[bool, List[Tuple]] = {}
+    for leicht in (False, True):
+        modul.PARSER_LEICHT = leicht
+        t0 = perf_counter()
+        komponenten[leicht] = modul.parse_bloecke(feed, feed.vevents)
+        parse[leicht] = perf_counter() - t0
+        termine[leicht] = vorkommen(modul, komponenten[leicht])
+        gesamt[leicht] = perf_counter() - t0
+    modul.PARSER_LEICHT = False
+
+    abweichungen: List[str] = []
+    if len(komponenten[False]) != len(komponenten[True]):
+        abweichungen.append(f"{name}: {len(komponenten[False])} VEVENTs (icalendar) ≠ {len(komponenten[True])} (leicht)")
+    for nr, (ical, leicht) in enumerate(zip(komponenten[False], komponenten[True])):
+        for prop in PROPERTIES:
+            a, b = normiere(prop, ical.get(prop)), normiere(prop, leicht.get(prop))
+            if a != b:
+                abweichungen.append(f"{name} VEVENT #{nr} {prop.upper()}: icalendar={a!r} leicht={b!r}")
+    if termine[False] != termine[True]:
+        abweichungen.append(f"{name}: expandierte Vorkommen unterscheiden sich")
+    # Der leichte Parser dekodiert erst beim Zugriff: aussagekräftig ist Parse + Expansion
+    print(
+        f"{name:<18} {len(feed.vevents):6d} VEVENTs  Parse {parse[False]:7.3f}s → {parse[True]:7.3f}s  "
+        f"mit Expansion {gesamt[False]:7.3f}s → {gesamt[True]:7.3f}s  "
+        f"({gesamt[False] / max(gesamt[True], 1e-9):4.1f}×)  {'ok' if not abweichungen else 'ABWEICHUNG'}"
+    )
+    return abweichungen
+
+
+def main() -> None:
+    benchmark = lade_modul("benchmark_kalender", "benchmark_kalender.py")
+    parser = argparse.ArgumentParser(description="Äquivalenz leichter Parser ↔ icalendar")
+    parser.add_argument("dateien", nargs="*", help="zusätzliche ICS-Dateien")
+    parser.add_argument("--nur", action="append", choices=sorted(benchmark.SZENARIEN), help="nur dieses Szenario")
+    args = parser.parse_args()
+
+    os.environ.setdefault("KALENDER_JETZT", benchmark.JETZT)
+    modul = lade_modul("erstelle_kalender", "erstelle_kalender.py")
+
+    feeds: List[Tuple[str, bytes]] = [("randfaelle", feed_randfaelle())]
+    feeds += [(name, benchmark.SZENARIEN[name](random.Random(name))) for name in args.nur or benchmark.SZENARIEN]
+    for pfad in args.dateien:
+        with open(pfad, "rb") as f:
+            feeds.append((os.path.basename(pfad), f.read()))
+
+    abweichungen: List[str] = []
+    for name, ics in feeds:
+        abweichungen += vergleiche_feed(modul, name, ics)
+    if abweichungen:
+        print("Abweichungen:", file=sys.stderr)
+        for zeile in abweichungen[:50]:
+            print(f"  - {zeile}", file=sys.stderr)
+        sys.exit(1)
+    print("Leichter Parser und icalendar sind auf allen Feeds gleichwertig.")
+
+
+if __name__ == "__main__":
+    main()